@@ -1,30 +1,62 @@
-import sys
 import os
-sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
+import glob
+import json
 
 import pandas as pd
-import numpy as np
 import joblib
 import logging
-from features.build_features import compute_embedding_similarity, add_structured_features
+from src.features.build_features import (APP_EMBED_PARQUET, JOB_EMBED_PARQUET, add_structured_features,
+                                         compute_embedding_similarity)
+from src.features.embedding_store import EmbeddingMatrix
+from src.features.job_table import load_fresh_job_table, load_jobs
+from src.io import db
 
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-def main():
-    logging.info("Loading trained model...")
-    model = joblib.load("xgboost_model.pkl")
+LATEST_MODEL_FILE = "latest_model.json"  # written by src/models/train_model.py
+
+
+def resolve_model_path(models_dir: str) -> str:
+    """Model written by the last training run; falls back to the newest *_model.pkl."""
+    pointer = os.path.join(models_dir, LATEST_MODEL_FILE)
+    if os.path.exists(pointer):
+        with open(pointer) as f:
+            return os.path.join(models_dir, json.load(f)["model"])
+    candidates = glob.glob(os.path.join(models_dir, "*_model.pkl"))
+    if not candidates:
+        raise FileNotFoundError(f"No trained model in {models_dir}; run `flyfox train` first")
+    return max(candidates, key=os.path.getmtime)
+
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+# the applicant–job pairs to score; supplied by the user, no pipeline stage writes this file
+PAIRS_PATH = os.path.join(BASE_DIR, "data", "unlabeled_applicant_job_pairs.csv")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="flyfox predict", description="Score applicant–job pairs.")
+    parser.add_argument("--pairs", default=PAIRS_PATH, help="CSV with Applicant.ID and Job.ID columns to score")
+    args = parser.parse_args(argv)
+
+    model_path = resolve_model_path(os.path.join(BASE_DIR, "models"))
+    logging.info(f"Loading trained model from {model_path}...")
+    model = joblib.load(model_path)
 
     logging.info("Loading new applicant–job pairs...")
-    BASE_DIR = os.path.dirname(__file__)
     DATA_DIR = os.path.join(BASE_DIR, "data")
-    pairs = pd.read_csv(os.path.join(DATA_DIR, "unlabeled_applicant_job_pairs.csv"))
+    RAW_DIR = os.path.join(DATA_DIR, "raw")
+    if not os.path.exists(args.pairs):
+        raise FileNotFoundError(f"No pairs to score at {args.pairs}: provide a CSV with Applicant.ID and "
+                                f"Job.ID columns (see README, Generate Predictions)")
+    pairs = pd.read_csv(args.pairs)
 
 
     # Load experience and job data
     logging.info("Merging experience and interests...")
-    exp = pd.read_csv("Experience.csv")
-    job_data = pd.read_csv("job_data.csv")
+    exp = pd.read_csv(os.path.join(RAW_DIR, "Experience.csv"))
 
     # Extract latest experience per applicant
     exp_latest = (
@@ -35,28 +67,28 @@ def main():
 
     # Merge metadata into the pairs dataframe
     df = pairs.copy()
-    df = df.merge(job_data[["Job.ID", "City", "State.Code", "text"]], on="Job.ID", how="left")
     df = df.merge(exp_latest[["Applicant.ID", "exp_last_city", "exp_last_state"]], on="Applicant.ID", how="left")
 
-    # Load embeddings
+    # Job-side location features come precomputed when the job table has been built
+    job_table = load_fresh_job_table()
+    if job_table is None:
+        jobs = load_jobs(os.path.join(RAW_DIR, "Combined_Jobs_Final.csv"), os.path.join(RAW_DIR, "job_data.csv"))
+        jobs = jobs.rename(columns={"Job.ID": "job_key"})
+        df = (df.assign(job_key=df["Job.ID"].astype(str).str.strip())
+                .merge(jobs, on="job_key", how="left").drop(columns="job_key"))
+
+    # Load embeddings: the Parquet files the embed stages write, as build_features uses
     logging.info("Loading embeddings...")
-    job_embeddings = np.load("embeddings/jobs/embeddings_dict.npy", allow_pickle=True).item()
-    applicant_embeddings = np.load("embeddings/applicants/embeddings_dict.npy", allow_pickle=True).item()
+    job_embeddings = EmbeddingMatrix.from_parquet(JOB_EMBED_PARQUET, id_col="Job.ID")
+    applicant_embeddings = EmbeddingMatrix.from_parquet(APP_EMBED_PARQUET, id_col="Applicant.ID")
 
-    # Compute embedding similarity
+    # Compute embedding similarity, dropping pairs without both embeddings
     logging.info("Computing embedding similarity...")
-    df = compute_embedding_similarity(df, job_embeddings, applicant_embeddings)
-
-    # Optional: filter out missing embeddings
-    missing_jobs = ~df["Job.ID"].isin(job_embeddings.keys())
-    missing_applicants = ~df["Applicant.ID"].isin(applicant_embeddings.keys())
-    logging.warning(f"Missing job embeddings: {missing_jobs.sum()}")
-    logging.warning(f"Missing applicant embeddings: {missing_applicants.sum()}")
-    df = df[~(missing_jobs | missing_applicants)]
+    df = compute_embedding_similarity(df, job_embeddings, applicant_embeddings, drop_missing=True)
 
     # Add structured features
     logging.info("Adding structured features...")
-    df = add_structured_features(df)
+    df = add_structured_features(df, job_table)
 
     # Select only feature columns used during training
     feature_cols = ['embedding_similarity', 'location_match', 'exp_years_total', 'exp_recency_days']
@@ -66,9 +98,13 @@ def main():
     df["match_probability"] = model.predict_proba(X)[:, 1]
 
     # Save predictions
-    output_path = "predictions.csv"
-    df[["Applicant.ID", "Job.ID", "match_probability"]].to_csv(output_path, index=False)
-    logging.info(f"Predictions saved to {output_path}")
+    if db.database_url():
+        db.connect().upsert_predictions(df[["Applicant.ID", "Job.ID", "match_probability"]])
+        logging.info("Predictions upserted into the database")
+    else:
+        output_path = os.path.join(BASE_DIR, "predictions.csv")
+        df[["Applicant.ID", "Job.ID", "match_probability"]].to_csv(output_path, index=False)
+        logging.info(f"Predictions saved to {output_path}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,41 @@
+import sys
+import argparse
+import importlib
+
+# command -> (module with a main() entry point, help text); modules are imported only
+# once their command is chosen so `flyfox --help` and light commands start instantly
+COMMANDS = {
+    "ingest": ("src.io.ingest", "Load and validate the raw CSV files"),
+    "embed": ("src.features.generate_embeddings", "Generate job and applicant embeddings"),
+    "features": ("src.features.build_features", "Build the applicant–job feature set"),
+    "train": ("src.models.train_model", "Train the match model (see `flyfox train --help`)"),
+    "predict": ("predict", "Score unlabeled applicant–job pairs (see `flyfox predict --help`)"),
+    "run": ("src.pipeline", "Run the config.yaml pipeline, skipping up-to-date stages (see `flyfox run --help`)"),
+}
+
+# commands that parse their own options, including --help
+PASSTHROUGH = {"train", "predict", "run"}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="flyfox", description="Flyfox job matching pipeline.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, (_, help_text) in COMMANDS.items():
+        sub.add_parser(name, help=help_text, add_help=name not in PASSTHROUGH)
+    sub.choices["features"].add_argument("--job-table", action="store_true",
+                                         help="rebuild the precomputed job feature table first")
+
+    args, rest = parser.parse_known_args(argv)
+    if rest and args.command not in PASSTHROUGH:
+        parser.error(f"unrecognized arguments: {' '.join(rest)}")
+
+    module = importlib.import_module(COMMANDS[args.command][0])
+    if args.command in PASSTHROUGH:
+        return module.main(rest)
+    if args.command == "features" and args.job_table:
+        importlib.import_module("src.features.job_table").main()
+    module.main()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
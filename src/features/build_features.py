@@ -2,7 +2,12 @@ import os
 import logging
 import pandas as pd
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+
+from src.features.embedding_store import EmbeddingMatrix
+from src.features.job_table import (JOB_DATA_PATH, JobTable, city_mentioned, load_fresh_job_table,
+                                    load_jobs as load_job_frame, normalize_location)
+from src.io import db
+from src.utils.diagnose_embedding_coverage import embedding_coverage, write_missing
 
 # ------------------ Config ------------------
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -23,43 +28,42 @@ APP_EMBED_PARQUET = os.path.join(PROJECT_ROOT, "embeddings", "applicants", "appl
 
 OUTPUT_PATH = os.path.join(FEATURES_DIR, "features.csv")
 
+GATHER_ROWS = 50_000
+
 # ------------------ Helpers ------------------
 
-def _parquet_to_dict(path: str, id_col: str) -> dict[str, np.ndarray]:
-    df = pd.read_parquet(path)
-    if id_col not in df.columns:
-        raise KeyError(f"Expected '{id_col}' in {path}, got: {list(df.columns)[:12]}")
-    ids = df[id_col].astype(str).str.strip()
-    vec_cols = [c for c in df.columns if c != id_col]
-    # keep a deterministic column order
-    vec_cols = sorted(vec_cols, key=lambda x: (len(str(x)), str(x)))
-    mat = df[vec_cols].to_numpy(dtype=float)
-    return {i: v for i, v in zip(ids, mat)}
+def _rowwise_cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Cosine similarity of a[i] and b[i]; 0 where either vector is all zeros."""
+    dots = np.einsum("ij,ij->i", a, b)
+    norms = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+    return np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
 
 # ------------------ Features ------------------
 
-def compute_embedding_similarity(df, job_embeddings, app_embeddings, drop_missing=False):
-    # normalize keys defensively
-    job_embeddings = {str(k).strip(): np.asarray(v) for k, v in job_embeddings.items()}
-    app_embeddings = {str(k).strip(): np.asarray(v) for k, v in app_embeddings.items()}
+def compute_embedding_similarity(df, job_embeddings, app_embeddings, drop_missing=False, diagnostics_dir=None,
+                                 job_rows=None):
+    """Cosine similarity of each pair's job and applicant embeddings, gathered from the matrices.
 
-    j_ids = df["Job.ID"].astype(str).str.strip().tolist()
-    a_ids = df["Applicant.ID"].astype(str).str.strip().tolist()
+    Embeddings are EmbeddingMatrix objects (plain {id: vector} dicts are converted). `job_rows`
+    are the pairs' job matrix rows when already known, e.g. from the job table's emb_row.
+    """
+    if isinstance(job_embeddings, dict):
+        job_embeddings = EmbeddingMatrix.from_dict(job_embeddings)
+    if isinstance(app_embeddings, dict):
+        app_embeddings = EmbeddingMatrix.from_dict(app_embeddings)
 
-    has_job = [jid in job_embeddings for jid in j_ids]
-    has_app = [aid in app_embeddings for aid in a_ids]
-    has_both = np.array(has_job) & np.array(has_app)
+    j_rows = job_embeddings.rows_for(df["Job.ID"]) if job_rows is None else np.asarray(job_rows)
+    a_rows = app_embeddings.rows_for(df["Applicant.ID"])
+    has_both = (j_rows >= 0) & (a_rows >= 0)
 
     total = len(df)
-    miss_jobs = total - int(np.sum(has_job))
-    miss_apps = total - int(np.sum(has_app))
+    miss_jobs = int((j_rows < 0).sum())
+    miss_apps = int((a_rows < 0).sum())
 
-    # diagnostics files
-    os.makedirs(FEATURES_DIR, exist_ok=True)
-    missing_jobs = sorted({jid for jid, ok in zip(j_ids, has_job) if not ok})
-    missing_apps = sorted({aid for aid, ok in zip(a_ids, has_app) if not ok})
-    pd.Series(missing_jobs, name="Job.ID").to_csv(os.path.join(FEATURES_DIR, "missing_job_embeddings.csv"), index=False)
-    pd.Series(missing_apps, name="Applicant.ID").to_csv(os.path.join(FEATURES_DIR, "missing_app_embeddings.csv"), index=False)
+    # diagnostics files, only when asked for
+    if diagnostics_dir is not None:
+        write_missing(embedding_coverage(df["Job.ID"], df["Applicant.ID"], job_embeddings.ids, app_embeddings.ids),
+                      diagnostics_dir)
 
     pct_jobs = 100 * (miss_jobs / total) if total else 0.0
     pct_apps = 100 * (miss_apps / total) if total else 0.0
@@ -69,39 +73,44 @@ def compute_embedding_similarity(df, job_embeddings, app_embeddings, drop_missin
     if drop_missing:
         df = df.loc[has_both].copy()
         logging.info(f"Dropped rows without both embeddings. New size: {len(df)}")
-        j_ids = df["Job.ID"].astype(str).str.strip().tolist()
-        a_ids = df["Applicant.ID"].astype(str).str.strip().tolist()
-
-    sims, flags = [], []
-    for jid, aid in zip(j_ids, a_ids):
-        jv = job_embeddings.get(jid)
-        av = app_embeddings.get(aid)
-        if jv is None or av is None:
-            sims.append(0.0)
-            flags.append(0)
-        else:
-            sims.append(float(cosine_similarity([jv], [av])[0][0]))
-            flags.append(1)
+        j_rows, a_rows = j_rows[has_both], a_rows[has_both]
+        has_both = np.ones(len(df), dtype=bool)
+
+    sims = np.zeros(len(df))
+    idx = np.flatnonzero(has_both)
+    # gather in blocks so memory stays bounded by GATHER_ROWS vectors, not one per pair
+    for start in range(0, len(idx), GATHER_ROWS):
+        block = idx[start:start + GATHER_ROWS]
+        jv = job_embeddings.vectors[j_rows[block]].astype(float)
+        av = app_embeddings.vectors[a_rows[block]].astype(float)
+        sims[block] = _rowwise_cosine(jv, av)
 
     df["embedding_similarity"] = sims
-    df["has_both_embeds"] = flags
+    df["has_both_embeds"] = has_both.astype(int)
     return df
 
-def add_structured_features(df):
-    job_state = df.get("State.Code", pd.Series([""] * len(df))).fillna("").str.lower()
-    job_city  = df.get("City", pd.Series([""] * len(df))).fillna("").str.lower()
-    text_col  = df.get("text", pd.Series([""] * len(df))).fillna("").str.lower()
-
-    exp_state = df.get("exp_last_state", pd.Series([""] * len(df))).fillna("").str.lower()
-    exp_city  = df.get("exp_last_city", pd.Series([""] * len(df))).fillna("").str.lower()
-
-    df["state_match"] = (job_state == exp_state).astype(int)
-    df["city_match"]  = (job_city == exp_city).astype(int)
-    df["location_match"] = df.apply(
-        lambda r: (str(r.get("exp_last_city", "")).lower() in str(r.get("text", "")).lower())
-                  if pd.notna(r.get("exp_last_city", "")) else 0,
-        axis=1
-    ).astype(int)
+def add_structured_features(df, job_table: JobTable | None = None, rows=None):
+    if job_table is not None:
+        # job side is precomputed: only Job.ID and the applicant's location are needed
+        flags = job_table.pair_location_features(
+            df["Job.ID"],
+            df.get("exp_last_city", pd.Series([None] * len(df))),
+            df.get("exp_last_state", pd.Series([None] * len(df))),
+            rows=rows,
+        )
+        for name, values in flags.items():
+            df[name] = values
+    else:
+        # same definitions as JobTable.pair_location_features, computed per pair
+        job_state = normalize_location(df.get("State.Code", pd.Series([""] * len(df), index=df.index)))
+        job_city  = normalize_location(df.get("City", pd.Series([""] * len(df), index=df.index)))
+
+        exp_state = normalize_location(df.get("exp_last_state", pd.Series([""] * len(df), index=df.index)))
+        exp_city  = normalize_location(df.get("exp_last_city", pd.Series([""] * len(df), index=df.index)))
+
+        df["state_match"] = (job_state == exp_state).astype(int)
+        df["city_match"]  = (job_city == exp_city).astype(int)
+        df["location_match"] = city_mentioned(exp_city, df.get("text", pd.Series([""] * len(df)))).astype(int)
     df["industry_match"] = df["location_match"]
     df["position_match"] = df["location_match"]
 
@@ -139,63 +148,79 @@ def load_interests(path):
               .apply(lambda s: " ".join(s.dropna().unique()))
               .reset_index())
 
+def load_jobs(path):
+    logging.info("Loading jobs...")
+    # same text the job table searches, so both location_match paths agree
+    return load_job_frame(path, JOB_DATA_PATH)
+
 # ------------------ Main ------------------
 
-def main():
-    logging.info("Loading base labeled pairs...")
-    base = pd.read_csv(LABELED_PATH)
+def build_feature_frame(base, exp_df, interest_df, job_embeddings, app_embeddings,
+                        job_table=None, jobs_df=None, diagnostics_dir=None):
+    """Features for one batch of (Job.ID, Applicant.ID, label) pairs."""
+    base = base.copy()
     base["Job.ID"] = base["Job.ID"].astype(str).str.strip()
     base["Applicant.ID"] = base["Applicant.ID"].astype(str).str.strip()
 
+    df = base.merge(exp_df, on="Applicant.ID", how="left")
+    df = df.merge(interest_df, on="Applicant.ID", how="left")
+    if job_table is None:
+        df = df.merge(jobs_df[["Job.ID", "City", "State.Code", "text"]], on="Job.ID", how="left")
+        rows = job_rows = None
+    else:
+        # one Job.ID lookup serves both the location features and the embedding gather
+        rows = job_table.rows_for(df["Job.ID"])
+        job_rows = None
+        if job_table.matches_embeddings(job_embeddings):
+            job_rows = job_table.embedding_rows(rows)
+            # pairs whose job is not in the table still get its embedding, if there is one
+            outside = rows < 0
+            if outside.any():
+                job_rows[outside] = job_embeddings.rows_for(df["Job.ID"].to_numpy()[outside])
+
+    df = compute_embedding_similarity(df, job_embeddings, app_embeddings, drop_missing=False,
+                                      diagnostics_dir=diagnostics_dir, job_rows=job_rows)
+    return add_structured_features(df, job_table, rows=rows)
+
+
+def main():
     logging.info("Loading experience & interests...")
     exp_df = load_experience(EXPERIENCE_PATH)
     interest_df = load_interests(INTEREST_PATH)
 
-    logging.info("Loading jobs (strict schema)...")
-    required_cols = [
-        "Job.ID", "City", "State.Name", "State.Code",
-        "Title", "Position", "Industry",
-        "Job.Description", "Requirements"
-    ]
-    jobs_df = pd.read_csv(
-        JOBS_PATH,
-        engine="python",
-        usecols=required_cols,
-        on_bad_lines="skip",
-        na_values=["NA"]
-    )
-
-    # strict validation
-    missing = [c for c in required_cols if c not in jobs_df.columns]
-    if missing:
-        raise KeyError(f"Missing required columns in Combined_Jobs_Final.csv: {missing}")
-
-    # deterministic text field
-    for c in ["Title", "Position", "Industry", "Job.Description", "Requirements"]:
-        jobs_df[c] = jobs_df[c].fillna("").astype(str)
-    jobs_df["Job.ID"] = jobs_df["Job.ID"].astype(str).str.strip()
-    jobs_df["text"] = (
-        jobs_df["Title"] + " " +
-        jobs_df["Position"] + " " +
-        jobs_df["Industry"] + " " +
-        jobs_df["Job.Description"] + " " +
-        jobs_df["Requirements"]
-    ).str.strip()
-
-    logging.info("Merging features...")
-    df = base.merge(exp_df, on="Applicant.ID", how="left")
-    df = df.merge(interest_df, on="Applicant.ID", how="left")
-    df = df.merge(jobs_df[["Job.ID", "City", "State.Code", "text"]], on="Job.ID", how="left")
+    jobs_df = None
+    job_table = load_fresh_job_table()
+    if job_table is not None:
+        logging.info("Using the precomputed job table")
+    else:
+        logging.info("No up-to-date job table; merging job text per pair")
+        jobs_df = load_jobs(JOBS_PATH)
 
     logging.info("Loading embeddings (from Parquet)...")
-    job_embeddings = _parquet_to_dict(JOB_EMBED_PARQUET, id_col="Job.ID")
-    app_embeddings = _parquet_to_dict(APP_EMBED_PARQUET, id_col="Applicant.ID")
+    job_embeddings = EmbeddingMatrix.from_parquet(JOB_EMBED_PARQUET, id_col="Job.ID")
+    app_embeddings = EmbeddingMatrix.from_parquet(APP_EMBED_PARQUET, id_col="Applicant.ID")
+
+    if db.database_url():
+        # stream pairs through a server-side cursor and write features batch by batch, all in one
+        # transaction: a failed run leaves the previous feature table in place, not a partial one
+        store = db.connect()
 
-    logging.info("Computing embedding similarity...")
-    df = compute_embedding_similarity(df, job_embeddings, app_embeddings, drop_missing=False)
+        def feature_batches():
+            for i, batch in enumerate(store.iter_table("pairs")):
+                logging.info(f"Building features for pair batch {i} ({len(batch)} rows)...")
+                yield build_feature_frame(batch, exp_df, interest_df, job_embeddings, app_embeddings,
+                                          job_table, jobs_df)
+
+        store.write_batches("features", feature_batches(), replace=True)
+        logging.info("Features saved to the database")
+        return
+
+    logging.info("Loading base labeled pairs...")
+    base = pd.read_csv(LABELED_PATH)
 
-    logging.info("Adding structured features...")
-    df = add_structured_features(df)
+    logging.info("Building features...")
+    df = build_feature_frame(base, exp_df, interest_df, job_embeddings, app_embeddings, job_table, jobs_df,
+                             diagnostics_dir=FEATURES_DIR)
 
     logging.info("Saving final feature set...")
     os.makedirs(FEATURES_DIR, exist_ok=True)
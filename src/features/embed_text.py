@@ -1,12 +1,12 @@
 import pandas as pd
 import numpy as np
-import os
-from sentence_transformers import SentenceTransformer
 
 from src.utils import logging_util
 
 
 def embed_texts(texts: list[str], model_name: str = 'all-MiniLM-L6-v2') -> np.ndarray:
+    # imported here so that only callers that actually encode text pay for torch/transformers
+    from sentence_transformers import SentenceTransformer
     model = SentenceTransformer(model_name)
     embeddings = model.encode(texts, show_progress_bar=True, normalize_embeddings=True)
     return embeddings
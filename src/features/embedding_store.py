@@ -0,0 +1,59 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# ------------------ Helpers ------------------
+
+def _normalize(ids) -> pd.Series:
+    return pd.Series(ids, dtype=object).astype(str).str.strip()
+
+
+def _keep_last(ids: pd.Series) -> np.ndarray:
+    """Mask keeping the last row of every repeated ID, like building a dict from the rows."""
+    return ~ids.duplicated(keep="last").to_numpy()
+
+
+def read_embedding_ids(path: str, id_col: str) -> pd.Index:
+    """IDs of an embedding Parquet file in matrix row order, reading only the ID column."""
+    import pyarrow.parquet as pq
+
+    schema = pq.read_schema(path)
+    if id_col not in schema.names:
+        raise KeyError(f"Expected '{id_col}' in {path}, got: {schema.names[:12]}")
+    ids = _normalize(pq.read_table(path, columns=[id_col]).column(id_col).to_pandas())
+    return pd.Index(ids[_keep_last(ids)])
+
+# ------------------ Matrix ------------------
+
+@dataclass
+class EmbeddingMatrix:
+    ids: pd.Index           # str, unique, one per row
+    vectors: np.ndarray     # float32, (n_ids, dim)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def rows_for(self, ids) -> np.ndarray:
+        """Matrix row per ID, -1 for IDs without an embedding."""
+        return self.ids.get_indexer(_normalize(ids)).astype(np.int64)
+
+    @classmethod
+    def from_parquet(cls, path: str, id_col: str) -> "EmbeddingMatrix":
+        df = pd.read_parquet(path)
+        if id_col not in df.columns:
+            raise KeyError(f"Expected '{id_col}' in {path}, got: {list(df.columns)[:12]}")
+        ids = _normalize(df[id_col])
+        # keep a deterministic column order
+        vec_cols = sorted((c for c in df.columns if c != id_col), key=lambda x: (len(str(x)), str(x)))
+        keep = _keep_last(ids)
+        return cls(pd.Index(ids[keep]), df[vec_cols].to_numpy(dtype=np.float32)[keep])
+
+    @classmethod
+    def from_dict(cls, embeddings: dict) -> "EmbeddingMatrix":
+        ids = _normalize(list(embeddings.keys()))
+        keep = _keep_last(ids)
+        vectors = [np.asarray(v, dtype=np.float32) for v in embeddings.values()]
+        if not vectors:
+            return cls(pd.Index([], dtype=object), np.empty((0, 0), dtype=np.float32))
+        return cls(pd.Index(ids[keep]), np.stack(vectors)[keep])
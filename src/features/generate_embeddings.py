@@ -1,5 +1,5 @@
 import os
-from src.io.ingest import load_all_raw
+from src.io.ingest import load_csv
 from src.features.embed_text import generate_job_embeddings, generate_applicant_embeddings
 
 # Define project root
@@ -10,14 +10,21 @@ EMBEDDINGS_DIR = os.path.join(PROJECT_ROOT, "embeddings")
 JOBS_EMB_PATH = os.path.join(EMBEDDINGS_DIR, "jobs", "job_embeddings.parquet")
 APPLICANTS_EMB_PATH = os.path.join(EMBEDDINGS_DIR, "applicants", "applicant_embeddings.parquet")
 
-if __name__ == "__main__":
-    # Load raw data
-    data = load_all_raw()
-
-    # Create embedding folders if not exist
+def embed_jobs():
     os.makedirs(os.path.dirname(JOBS_EMB_PATH), exist_ok=True)
+    generate_job_embeddings(load_csv("jobs"), JOBS_EMB_PATH)
+
+
+def embed_applicants():
     os.makedirs(os.path.dirname(APPLICANTS_EMB_PATH), exist_ok=True)
+    generate_applicant_embeddings(load_csv("experience"), APPLICANTS_EMB_PATH)
 
-    # Generate and save embeddings
-    generate_job_embeddings(data["jobs"], JOBS_EMB_PATH)
-    generate_applicant_embeddings(data["experience"], APPLICANTS_EMB_PATH)
+
+def main():
+    # Jobs and applicants are independent; the pipeline runner schedules them in parallel
+    embed_jobs()
+    embed_applicants()
+
+
+if __name__ == "__main__":
+    main()
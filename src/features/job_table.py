@@ -0,0 +1,320 @@
+import os
+import re
+import json
+import logging
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from src.features.embedding_store import read_embedding_ids
+
+# ------------------ Config ------------------
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+RAW_DIR = os.path.join(PROJECT_ROOT, "data", "raw")
+INTERIM_DIR = os.path.join(PROJECT_ROOT, "data", "interim")
+
+JOBS_PATH = os.path.join(RAW_DIR, "Combined_Jobs_Final.csv")
+JOB_DATA_PATH = os.path.join(RAW_DIR, "job_data.csv")
+EXPERIENCE_PATH = os.path.join(RAW_DIR, "Experience.csv")
+JOB_EMBED_PARQUET = os.path.join(PROJECT_ROOT, "embeddings", "jobs", "job_embeddings.parquet")
+
+# the table is stale once any of these changes (or appears/disappears) after the build
+SOURCE_PATHS = (JOBS_PATH, JOB_DATA_PATH, EXPERIENCE_PATH, JOB_EMBED_PARQUET)
+
+JOB_TABLE_DIR = os.path.join(INTERIM_DIR, "job_table")
+
+# bump whenever the normalization or the stored arrays change
+JOB_TABLE_VERSION = 3
+
+# codes for values absent from the vocabulary; MISSING == MISSING still counts as a match,
+# mirroring the old string comparison of two empty fields, UNKNOWN never matches
+MISSING = -1
+UNKNOWN = -2
+
+# longer cities are still encoded, but not searched for in job texts
+MAX_CITY_WORDS = 3
+
+TEXT_COLS = ["Title", "Position", "Industry", "Job.Description", "Requirements"]
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+_ARRAYS = ("job_ids", "city", "state", "emb_row", "text_city_offsets", "text_city_codes",
+           "city_offsets", "city_jobs", "state_offsets", "state_jobs")
+
+# ------------------ Helpers ------------------
+
+def normalize_location(values: pd.Series) -> pd.Series:
+    """Lowercase and collapse punctuation/whitespace, e.g. 'St. Louis ' -> 'st louis'."""
+    return values.fillna("").astype(str).str.lower().str.findall(_TOKEN_RE).str.join(" ")
+
+
+def city_mentioned(cities, texts, max_words: int = MAX_CITY_WORDS) -> np.ndarray:
+    """Whether each city occurs in the matching text as a whole-word phrase of <= max_words words.
+
+    This is the definition of `location_match`; the job table precomputes the same thing.
+    """
+    city = normalize_location(pd.Series(cities, dtype=object)).to_numpy()
+    codes, uniques = pd.factorize(pd.Series(texts, dtype=object).fillna(""))
+    text = normalize_location(pd.Series(uniques, dtype=object)).to_numpy()[codes] if len(uniques) else codes
+    return np.array([bool(c) and len(c.split()) <= max_words and f" {c} " in f" {t} "
+                     for c, t in zip(city, text)], dtype=bool)
+
+
+def _encode(values: pd.Series, vocab: dict[str, int]) -> np.ndarray:
+    """Map raw strings to vocabulary codes, normalizing each distinct value only once."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    norm = normalize_location(pd.Series(uniques, dtype=object))
+    lookup = np.array([vocab.get(v, UNKNOWN) if v else MISSING for v in norm], dtype=np.int32)
+    return np.where(codes >= 0, lookup[codes] if len(lookup) else MISSING, MISSING).astype(np.int32)
+
+
+def _inverted_index(keys: np.ndarray, n_keys: int) -> tuple[np.ndarray, np.ndarray]:
+    """CSR layout: rows holding key k are rows[offsets[k]:offsets[k + 1]]."""
+    valid = np.flatnonzero(keys >= 0)
+    rows = valid[np.argsort(keys[valid], kind="stable")].astype(np.int32)
+    offsets = np.zeros(n_keys + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys[valid], minlength=n_keys), out=offsets[1:])
+    return offsets, rows
+
+
+def _find_cities(texts, vocab: dict[str, int], max_words: int) -> tuple[np.ndarray, np.ndarray]:
+    """Per text, the sorted set of vocabulary cities occurring as whole-word n-grams (CSR)."""
+    offsets, codes = [0], []
+    for text in texts:
+        tokens = _TOKEN_RE.findall(text)
+        found = set()
+        for n in range(1, max_words + 1):
+            for i in range(len(tokens) - n + 1):
+                code = vocab.get(" ".join(tokens[i:i + n]))
+                if code is not None:
+                    found.add(code)
+        codes.extend(sorted(found))
+        offsets.append(len(codes))
+    return np.asarray(offsets, dtype=np.int64), np.asarray(codes, dtype=np.int32)
+
+
+def _fingerprint(path: str) -> dict | None:
+    if not os.path.exists(path):
+        return None
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime": st.st_mtime}
+
+
+def source_fingerprints(paths=SOURCE_PATHS) -> dict[str, dict | None]:
+    """size+mtime of each source file keyed by its path relative to the project root."""
+    return {os.path.relpath(p, PROJECT_ROOT): _fingerprint(p) for p in paths}
+
+# ------------------ Table ------------------
+
+@dataclass
+class JobTable:
+    job_ids: np.ndarray            # str, one row per job
+    city: np.ndarray               # int32 city code per job
+    state: np.ndarray              # int32 state code per job
+    emb_row: np.ndarray            # int32 row in the job EmbeddingMatrix, -1 if absent
+    text_city_offsets: np.ndarray  # CSR: cities mentioned in each job's text
+    text_city_codes: np.ndarray
+    city_offsets: np.ndarray       # CSR: city code -> job rows
+    city_jobs: np.ndarray
+    state_offsets: np.ndarray      # CSR: state code -> job rows
+    state_jobs: np.ndarray
+    cities: list[str]
+    states: list[str]
+    meta: dict = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.city_vocab = {c: i for i, c in enumerate(self.cities)}
+        self.state_vocab = {s: i for i, s in enumerate(self.states)}
+        self._row_of = pd.Index(self.job_ids)
+        # sorted (job_row, city) keys for vectorized "city mentioned in text" lookups
+        n_mentions = np.diff(self.text_city_offsets)
+        job_rows = np.repeat(np.arange(len(self.job_ids), dtype=np.int64), n_mentions)
+        self._text_keys = np.sort(job_rows * max(len(self.cities), 1) + self.text_city_codes)
+
+    def rows_for(self, job_ids) -> np.ndarray:
+        """Table row per Job.ID, -1 for jobs not in the table."""
+        ids = pd.Series(job_ids).astype(str).str.strip()
+        return self._row_of.get_indexer(ids).astype(np.int64)
+
+    def embedding_rows(self, rows: np.ndarray) -> np.ndarray:
+        """Job embedding matrix row per table row from rows_for, -1 where either is missing."""
+        return np.where(rows >= 0, self.emb_row[np.maximum(rows, 0)], -1)
+
+    def matches_embeddings(self, embeddings) -> bool:
+        """Whether emb_row was built against this embedding matrix (same IDs in the same rows)."""
+        return self.meta.get("n_embeddings") == len(embeddings)
+
+    def stale_sources(self) -> list[str]:
+        """Source files that changed since the table was built (all of them if none were recorded)."""
+        recorded = self.meta.get("sources")
+        if recorded is None:
+            return ["<unrecorded sources>"]
+        return [rel for rel, fp in recorded.items() if _fingerprint(os.path.join(PROJECT_ROOT, rel)) != fp]
+
+    def jobs_in_location(self, city: str | None = None, state: str | None = None) -> np.ndarray:
+        """Job.IDs located in `city` and/or `state`, straight from the inverted index."""
+        rows = None
+        for value, vocab, offsets, jobs in ((city, self.city_vocab, self.city_offsets, self.city_jobs),
+                                            (state, self.state_vocab, self.state_offsets, self.state_jobs)):
+            if value is None:
+                continue
+            code = vocab.get(normalize_location(pd.Series([value]))[0])
+            hit = jobs[offsets[code]:offsets[code + 1]] if code is not None else np.empty(0, dtype=np.int32)
+            rows = hit if rows is None else np.intersect1d(rows, hit, assume_unique=True)
+        if rows is None:
+            return self.job_ids
+        return self.job_ids[np.sort(rows)]
+
+    def pair_location_features(self, job_ids, app_cities, app_states, rows=None) -> dict[str, np.ndarray]:
+        """state/city/location match flags for pairs as gathers over the precomputed codes.
+
+        `rows` (from rows_for) saves the Job.ID lookup when the caller already has them.
+        """
+        rows = self.rows_for(job_ids) if rows is None else rows
+        known = rows >= 0
+        safe_rows = np.where(known, rows, 0)
+
+        j_city = np.where(known, self.city[safe_rows], MISSING)
+        j_state = np.where(known, self.state[safe_rows], MISSING)
+        a_city = _encode(pd.Series(app_cities, dtype=object), self.city_vocab)
+        a_state = _encode(pd.Series(app_states, dtype=object), self.state_vocab)
+
+        keys = safe_rows * max(len(self.cities), 1) + np.maximum(a_city, 0)
+        pos = np.minimum(np.searchsorted(self._text_keys, keys), max(len(self._text_keys) - 1, 0))
+        in_text = (self._text_keys[pos] == keys) if len(self._text_keys) else np.zeros(len(keys), dtype=bool)
+
+        return {
+            "state_match": ((j_state == a_state) & (a_state != UNKNOWN)).astype(int),
+            "city_match": ((j_city == a_city) & (a_city != UNKNOWN)).astype(int),
+            "location_match": (known & (a_city >= 0) & in_text).astype(int),
+        }
+
+    def save(self, out_dir: str = JOB_TABLE_DIR) -> None:
+        os.makedirs(out_dir, exist_ok=True)
+        np.savez(os.path.join(out_dir, "job_table.npz"), **{k: getattr(self, k) for k in _ARRAYS})
+        with open(os.path.join(out_dir, "meta.json"), "w") as f:
+            json.dump({**self.meta, "cities": self.cities, "states": self.states}, f)
+
+    @classmethod
+    def load(cls, table_dir: str = JOB_TABLE_DIR) -> "JobTable":
+        with open(os.path.join(table_dir, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("version") != JOB_TABLE_VERSION:
+            raise ValueError(f"Job table in {table_dir} is version {meta.get('version')}, "
+                             f"expected {JOB_TABLE_VERSION}; rebuild it with src.features.job_table")
+        cities, states = meta.pop("cities"), meta.pop("states")
+        with np.load(os.path.join(table_dir, "job_table.npz")) as arrays:
+            return cls(**{k: arrays[k] for k in _ARRAYS}, cities=cities, states=states, meta=meta)
+
+
+def job_table_exists(table_dir: str = JOB_TABLE_DIR) -> bool:
+    return os.path.exists(os.path.join(table_dir, "meta.json"))
+
+
+def load_fresh_job_table(table_dir: str = JOB_TABLE_DIR) -> JobTable | None:
+    """The saved table, or None (compute job features per pair) if it is missing or stale."""
+    if not job_table_exists(table_dir):
+        return None
+    table = JobTable.load(table_dir)
+    stale = table.stale_sources()
+    if stale:
+        # new jobs would get row -1 and silently lose their location features
+        logging.warning(f"Job table in {table_dir} is older than {', '.join(stale)}; ignoring it. "
+                        f"Rebuild it with: python -m src.features.job_table")
+        return None
+    return table
+
+# ------------------ Build ------------------
+
+def build_job_table(jobs_df: pd.DataFrame, job_text: pd.Series, embedding_ids=None,
+                    extra_cities=None, max_city_words: int = MAX_CITY_WORDS) -> JobTable:
+    """Build the table from one row per job (Job.ID, City, State.Code) and its text.
+
+    `embedding_ids` are the job embedding matrix IDs in row order (read_embedding_ids).
+    `extra_cities` (e.g. applicant cities from Experience.csv) extend the vocabulary so
+    their mentions in job texts are indexed too. Every city gets a code; only those of at
+    most `max_city_words` words are searched for in the texts.
+    """
+    jobs_df = jobs_df.assign(**{"Job.ID": jobs_df["Job.ID"].astype(str).str.strip()})
+    keep = ~jobs_df["Job.ID"].duplicated().to_numpy()
+    jobs_df = jobs_df.loc[keep].reset_index(drop=True)
+    job_text = pd.Series(job_text).loc[keep].reset_index(drop=True)
+
+    city_norm = normalize_location(jobs_df["City"])
+    state_norm = normalize_location(jobs_df["State.Code"])
+    all_cities = pd.concat([city_norm, normalize_location(pd.Series(extra_cities, dtype=object))])
+    cities = sorted(c for c in all_cities.unique() if c)
+    states = sorted(s for s in state_norm.unique() if s)
+    city_vocab = {c: i for i, c in enumerate(cities)}
+    state_vocab = {s: i for i, s in enumerate(states)}
+    search_vocab = {c: i for c, i in city_vocab.items() if len(c.split()) <= max_city_words}
+
+    city = _encode(jobs_df["City"], city_vocab)
+    state = _encode(jobs_df["State.Code"], state_vocab)
+    text_city_offsets, text_city_codes = _find_cities(job_text.fillna("").astype(str).str.lower(),
+                                                      search_vocab, max_city_words)
+    city_offsets, city_jobs = _inverted_index(city, len(cities))
+    state_offsets, state_jobs = _inverted_index(state, len(states))
+
+    job_ids = jobs_df["Job.ID"].to_numpy(dtype=str)
+    meta = {"version": JOB_TABLE_VERSION}
+    if embedding_ids is not None:
+        emb_row = pd.Index(embedding_ids).get_indexer(job_ids).astype(np.int32)
+        meta["n_embeddings"] = len(embedding_ids)
+    else:
+        emb_row = np.full(len(job_ids), -1, dtype=np.int32)
+
+    return JobTable(job_ids=job_ids, city=city, state=state, emb_row=emb_row,
+                    text_city_offsets=text_city_offsets, text_city_codes=text_city_codes,
+                    city_offsets=city_offsets, city_jobs=city_jobs,
+                    state_offsets=state_offsets, state_jobs=state_jobs,
+                    cities=cities, states=states, meta=meta)
+
+def load_jobs(jobs_path: str = JOBS_PATH, job_data_path: str = JOB_DATA_PATH) -> pd.DataFrame:
+    """Job.ID, City, State.Code and the text searched for city mentions, one row per job.
+
+    The text is the Combined_Jobs_Final.csv text fields plus job_data.csv's `text` when that
+    file exists; the table and the per-pair fallback both search this same text.
+    """
+    jobs_df = pd.read_csv(jobs_path, engine="python", usecols=["Job.ID", "City", "State.Code", *TEXT_COLS],
+                          on_bad_lines="skip", na_values=["NA"])
+    jobs_df["Job.ID"] = jobs_df["Job.ID"].astype(str).str.strip()
+    jobs_df = jobs_df.drop_duplicates("Job.ID").reset_index(drop=True)
+    text = jobs_df[TEXT_COLS].fillna("").astype(str).agg(" ".join, axis=1)
+
+    if job_data_path and os.path.exists(job_data_path):
+        job_data = pd.read_csv(job_data_path, usecols=["Job.ID", "text"])
+        job_data["Job.ID"] = job_data["Job.ID"].astype(str).str.strip()
+        extra = job_data.drop_duplicates("Job.ID").set_index("Job.ID")["text"]
+        text = text + " " + jobs_df["Job.ID"].map(extra).fillna("").astype(str)
+
+    jobs_df["text"] = text.str.strip()
+    return jobs_df[["Job.ID", "City", "State.Code", "text"]]
+
+# ------------------ Main ------------------
+
+def main():
+    logging.info("Loading jobs...")
+    jobs_df = load_jobs(JOBS_PATH, JOB_DATA_PATH)
+
+    extra_cities = None
+    if os.path.exists(EXPERIENCE_PATH):
+        extra_cities = pd.read_csv(EXPERIENCE_PATH, usecols=["City"])["City"].dropna().unique()
+
+    embedding_ids = None
+    if os.path.exists(JOB_EMBED_PARQUET):
+        embedding_ids = read_embedding_ids(JOB_EMBED_PARQUET, "Job.ID")
+
+    logging.info("Building job feature table...")
+    table = build_job_table(jobs_df, jobs_df["text"], embedding_ids=embedding_ids, extra_cities=extra_cities)
+    table.meta["sources"] = source_fingerprints()
+    table.save(JOB_TABLE_DIR)
+    logging.info(f"Job table ({len(table.job_ids)} jobs, {len(table.cities)} cities, "
+                 f"{len(table.states)} states) saved to: {JOB_TABLE_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -60,7 +60,11 @@ def load_all_raw():
     return {key: load_csv(key) for key in FILES}
 
 
-if __name__ == "__main__":
+def main():
     datasets = load_all_raw()
     for k, v in datasets.items():
         print(f"{k}: {v.shape}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
-from sentence_transformers import SentenceTransformer
-
 class BertEmbedder:
     def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+        from sentence_transformers import SentenceTransformer
         self.model = SentenceTransformer(model_name)
 
     def encode(self, texts):
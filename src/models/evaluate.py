@@ -0,0 +1,141 @@
+import os
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+# ------------------ Config ------------------
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+RAW_DIR = os.path.join(PROJECT_ROOT, "data", "raw")
+VIEWS_PATH = os.path.join(RAW_DIR, "Job_Views.csv")
+
+DEFAULT_KS = (5, 10, 20)
+
+# ------------------ Ranking metrics ------------------
+
+def _segments(group_ids: np.ndarray, scores: np.ndarray):
+    """Sort rows by (group, -score) and return the order plus per-group start offsets and sizes."""
+    order = np.lexsort((-scores, group_ids))
+    g = group_ids[order]
+    starts = np.flatnonzero(np.r_[True, g[1:] != g[:-1]])
+    sizes = np.diff(np.r_[starts, len(g)])
+    return order, starts, sizes
+
+
+def ranking_metrics(group_ids, scores, labels, ks=DEFAULT_KS) -> dict:
+    """Precision@K, recall@K, NDCG@K and MAP averaged over groups (e.g. applicants).
+
+    Everything is computed on one sorted array with segment reductions, so the cost is a
+    single O(n log n) sort regardless of the number of groups. Groups without any positive
+    label are skipped, as their recall, AP and NDCG are undefined.
+    """
+    group_ids = np.asarray(group_ids)
+    if group_ids.dtype == object:
+        group_ids = pd.factorize(group_ids)[0]
+    scores = np.asarray(scores, dtype=np.float64)
+    rel_all = (np.asarray(labels) > 0).astype(np.float64)
+
+    n = len(scores)
+    report = {"n_rows": int(n), "n_groups": 0, "n_groups_evaluated": 0}
+    if n == 0:
+        return report
+
+    order, starts, sizes = _segments(group_ids, scores)
+    rel = rel_all[order]
+    rank = np.arange(n) - np.repeat(starts, sizes)  # 0-based position within the group
+
+    n_rel = np.add.reduceat(rel, starts)
+    keep = n_rel > 0
+    report["n_groups"] = int(len(starts))
+    report["n_groups_evaluated"] = int(keep.sum())
+    if not keep.any():
+        return report
+
+    # running hit count within each group: global cumsum minus the group's offset
+    cum = np.cumsum(rel)
+    hits = cum - np.repeat(cum[starts] - rel[starts], sizes)
+    discount = 1.0 / np.log2(rank + 2.0)
+
+    ap = np.add.reduceat(rel * hits / (rank + 1.0), starts)[keep] / n_rel[keep]
+    report["map"] = float(ap.mean())
+
+    ideal_cum = np.cumsum(1.0 / np.log2(np.arange(max(ks)) + 2.0))
+    for k in ks:
+        in_top = rank < k
+        hits_k = np.add.reduceat(rel * in_top, starts)[keep]
+        dcg = np.add.reduceat(rel * discount * in_top, starts)[keep]
+        idcg = ideal_cum[np.minimum(n_rel[keep], k).astype(int) - 1]
+        report[f"precision@{k}"] = float((hits_k / k).mean())
+        report[f"recall@{k}"] = float((hits_k / n_rel[keep]).mean())
+        report[f"ndcg@{k}"] = float((dcg / idcg).mean())
+    return report
+
+# ------------------ Splits ------------------
+
+def load_view_times(path: str = VIEWS_PATH) -> pd.DataFrame:
+    views = pd.read_csv(path, usecols=["Applicant.ID", "Job.ID", "View.Start"])
+    views["Applicant.ID"] = views["Applicant.ID"].astype(str).str.strip()
+    views["Job.ID"] = views["Job.ID"].astype(str).str.strip()
+    views["View.Start"] = pd.to_datetime(views["View.Start"], errors="coerce")
+    return views.dropna(subset=["View.Start"])
+
+
+def time_split_mask(pairs: pd.DataFrame, views: pd.DataFrame, test_frac: float = 0.2,
+                    cutoff: pd.Timestamp | None = None) -> np.ndarray:
+    """Boolean test mask for `pairs` (Applicant.ID, Job.ID) split on View.Start.
+
+    A pair is timestamped by its own first view; pairs that were never viewed (sampled
+    negatives, interest-mapped positives) inherit their applicant's latest view. Pairs with
+    no timestamp at all stay in train. Without an explicit `cutoff` the latest `test_frac`
+    of timestamped pairs become the test set.
+    """
+    a_ids = pairs["Applicant.ID"].astype(str).str.strip()
+    j_ids = pairs["Job.ID"].astype(str).str.strip()
+
+    pair_time = views.groupby(["Applicant.ID", "Job.ID"])["View.Start"].min()
+    app_time = views.groupby("Applicant.ID")["View.Start"].max()
+
+    ts = pd.Series(pair_time.reindex(pd.MultiIndex.from_arrays([a_ids, j_ids])).to_numpy())
+    ts = ts.fillna(pd.Series(app_time.reindex(a_ids).to_numpy()))
+
+    if cutoff is None:
+        if ts.notna().sum() == 0:
+            raise ValueError("No pair could be timestamped from the views; cannot build a time split")
+        cutoff = ts.quantile(1.0 - test_frac)
+    mask = (ts > cutoff).to_numpy()
+    logging.info(f"Time split at {cutoff}: {mask.sum()} test / {len(mask) - mask.sum()} train rows")
+    return mask
+
+# ------------------ Reports ------------------
+
+def evaluate_predictions(df: pd.DataFrame, score_col: str = "match_probability", label_col: str = "label",
+                         group_col: str = "Applicant.ID", ks=DEFAULT_KS) -> dict:
+    group_codes = pd.factorize(df[group_col])[0]
+    return ranking_metrics(group_codes, df[score_col].to_numpy(), df[label_col].to_numpy(), ks=ks)
+
+
+def write_report(report: dict, path: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    logging.info(f"Evaluation report saved to: {path}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Per-applicant ranking metrics for scored applicant–job pairs.")
+    parser.add_argument("predictions", help="CSV with Applicant.ID, a score column and a label column")
+    parser.add_argument("--score-col", default="match_probability")
+    parser.add_argument("--label-col", default="label")
+    parser.add_argument("--k", type=int, nargs="+", default=list(DEFAULT_KS))
+    parser.add_argument("--output", default="evaluation_report.json")
+    args = parser.parse_args()
+
+    preds = pd.read_csv(args.predictions, usecols=["Applicant.ID", args.score_col, args.label_col])
+    report = evaluate_predictions(preds, args.score_col, args.label_col, ks=tuple(args.k))
+    logging.info(json.dumps(report))
+    write_report(report, args.output)
@@ -1,29 +1,329 @@
+import os
+import sys
+import json
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report
 import joblib
 
-# Load features
-df = pd.read_csv("data/features.csv")
+from src.io import db
+from src.models.evaluate import VIEWS_PATH, load_view_times, ranking_metrics, time_split_mask
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ------------------ Config ------------------
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+FEATURES_DIR = os.path.join(PROJECT_ROOT, "data", "features")
+MODELS_DIR = os.path.join(PROJECT_ROOT, "models")
+LATEST_MODEL_FILE = "latest_model.json"  # keep in sync with predict.py
+
+FEATURES_PATH = os.path.join(FEATURES_DIR, "features.csv")
+
+FEATURE_COLS = ["embedding_similarity", "location_match", "exp_years_total", "exp_recency_days"]
+ID_COLS = ["Applicant.ID", "Job.ID"]
+LABEL_COLS = ("label", "match")  # ground_truth/negative_sampling write "label", older dumps "match"
+
+CHUNK_SIZE = 500_000
+
+DEFAULT_PARAMS = {
+    "lightgbm": {
+        "n_estimators": 2000,
+        "learning_rate": 0.05,
+        "num_leaves": 31,
+        "max_bin": 255,
+        "min_child_samples": 50,
+        "subsample": 0.8,
+        "subsample_freq": 1,
+        "colsample_bytree": 1.0,
+    },
+    "xgboost": {
+        "n_estimators": 2000,
+        "learning_rate": 0.05,
+        "max_depth": 6,
+        "max_bin": 256,
+        "min_child_weight": 1,
+        "subsample": 0.8,
+        "colsample_bytree": 1.0,
+    },
+    "logreg": {
+        "max_iter": 1000,
+    },
+}
+
+SEARCH_SPACE = {
+    "lightgbm": {
+        "num_leaves": [15, 31, 63],
+        "learning_rate": [0.03, 0.1],
+        "min_child_samples": [20, 100],
+    },
+    "xgboost": {
+        "max_depth": [4, 6, 8],
+        "learning_rate": [0.03, 0.1],
+        "min_child_weight": [1, 5],
+    },
+}
+
+EARLY_STOPPING_ROUNDS = 50
+
+# ------------------ Data loading ------------------
+
+def _resolve_label_col(columns) -> str:
+    for c in LABEL_COLS:
+        if c in columns:
+            return c
+    raise KeyError(f"Expected one of {LABEL_COLS} in feature store, got: {list(columns)[:12]}")
+
+
+def load_features(path: str = FEATURES_PATH, feature_cols=FEATURE_COLS,
+                  chunksize: int = CHUNK_SIZE) -> tuple[np.ndarray, np.ndarray, pd.DataFrame]:
+    """Read only the model and ID columns of the feature store as float32, chunk by chunk.
+
+    `path` is a CSV/Parquet file or a database URL, which is streamed through a server-side cursor.
+    """
+    if db.is_database_url(path):
+        label_col = "label"
+        chunks = db.connect(path).iter_table("features", [*ID_COLS, *feature_cols, label_col], chunksize=chunksize)
+    elif path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        label_col = _resolve_label_col(pq.read_schema(path).names)
+        df = pd.read_parquet(path, columns=[*ID_COLS, *feature_cols, label_col])
+        chunks = [df]
+    else:
+        header = pd.read_csv(path, nrows=0).columns
+        label_col = _resolve_label_col(header)
+        dtypes = {c: np.float32 for c in feature_cols}
+        dtypes[label_col] = np.float32
+        dtypes.update({c: str for c in ID_COLS})
+        chunks = pd.read_csv(path, usecols=[*ID_COLS, *feature_cols, label_col], dtype=dtypes,
+                             chunksize=chunksize)
+
+    X_parts, y_parts, id_parts = [], [], []
+    for chunk in chunks:
+        # rows without a similarity score carry no signal for the model
+        chunk = chunk.dropna(subset=["embedding_similarity", label_col])
+        X_parts.append(chunk[feature_cols].to_numpy(dtype=np.float32))
+        y_parts.append(chunk[label_col].to_numpy(dtype=np.int8))
+        id_parts.append(chunk[ID_COLS])
+
+    X = np.concatenate(X_parts) if X_parts else np.empty((0, len(feature_cols)), dtype=np.float32)
+    y = np.concatenate(y_parts) if y_parts else np.empty(0, dtype=np.int8)
+    ids = pd.concat(id_parts, ignore_index=True) if id_parts else pd.DataFrame(columns=ID_COLS)
+    logging.info(f"Loaded {len(y)} rows x {X.shape[1]} features ({X.nbytes / 1e6:.1f} MB) from {path}")
+    return X, y, ids
+
+# ------------------ Training ------------------
+
+def _reset_peak_memory() -> bool:
+    """Reset the process' peak RSS so the next reading covers one fit (Linux >= 4.0 only)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_memory_mb() -> float:
+    """Peak resident set size in MB: since the last reset on Linux, else the process lifetime peak."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1024
+
+
+def build_model(model_type: str, params: dict | None = None, n_jobs: int = -1):
+    params = {**DEFAULT_PARAMS[model_type], **(params or {})}
+    if model_type == "lightgbm":
+        import lightgbm as lgb
+        return lgb.LGBMClassifier(objective="binary", n_jobs=n_jobs, verbose=-1, **params)
+    if model_type == "xgboost":
+        import xgboost as xgb
+        return xgb.XGBClassifier(
+            objective="binary:logistic", tree_method="hist", eval_metric="logloss",
+            early_stopping_rounds=EARLY_STOPPING_ROUNDS, n_jobs=n_jobs, **params
+        )
+    if model_type == "logreg":
+        from sklearn.linear_model import LogisticRegression
+        return LogisticRegression(**params)
+    raise ValueError(f"Unknown model type: {model_type}")
+
+
+def fit_model(model_type: str, X_train, y_train, X_val, y_val, params: dict | None = None, n_jobs: int = -1):
+    """Fit one model with early stopping on the validation set. Returns (model, stats)."""
+    from sklearn.metrics import log_loss
+
+    model = build_model(model_type, params, n_jobs=n_jobs)
+
+    # pool workers are reused across trials, so without a reset the peak would be the worker's so far
+    per_fit = _reset_peak_memory()
+    start = time.perf_counter()
+    if model_type == "lightgbm":
+        import lightgbm as lgb
+        model.fit(X_train, y_train, eval_set=[(X_val, y_val)], eval_metric="binary_logloss",
+                  callbacks=[lgb.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)])
+        best_iteration = int(model.best_iteration_ or model.n_estimators)
+    elif model_type == "xgboost":
+        model.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
+        best_iteration = int(model.best_iteration) + 1
+    else:
+        model.fit(X_train, y_train)
+        best_iteration = None
+    fit_seconds = time.perf_counter() - start
+
+    val_proba = model.predict_proba(X_val)[:, 1]
+    stats = {
+        "params": params or {},
+        "best_iteration": best_iteration,
+        "val_logloss": float(log_loss(y_val, val_proba, labels=[0, 1])),
+        "fit_seconds": round(fit_seconds, 3),
+        "peak_memory_mb": round(_peak_memory_mb(), 1),
+        "peak_memory_scope": "fit" if per_fit else "process",
+    }
+    return model, stats
+
+# ------------------ Hyperparameter search ------------------
+
+_WORKER_DATA = {}
+
+
+def _init_worker(X_train, y_train, X_val, y_val):
+    # ship the arrays once per worker process instead of once per trial
+    _WORKER_DATA.update(X_train=X_train, y_train=y_train, X_val=X_val, y_val=y_val)
+
+
+def _run_trial(model_type: str, params: dict, n_jobs: int):
+    d = _WORKER_DATA
+    return fit_model(model_type, d["X_train"], d["y_train"], d["X_val"], d["y_val"], params, n_jobs=n_jobs)
+
+
+def hyperparameter_search(model_type: str, X_train, y_train, X_val, y_val,
+                          search_space: dict | None = None, max_workers: int | None = None):
+    """Evaluate every point of the search grid in a process pool.
+
+    Returns the trial stats sorted best-first by val logloss and the best trial's fitted model,
+    which was trained on the same data the final model would be, so it is not refit.
+    """
+    from sklearn.model_selection import ParameterGrid
+
+    grid = list(ParameterGrid(search_space or SEARCH_SPACE[model_type]))
+    cpus = os.cpu_count() or 1
+    max_workers = min(max_workers or cpus, len(grid))
+    # split the cores between workers so trials don't oversubscribe each other
+    threads_per_trial = max(1, cpus // max_workers)
+    logging.info(f"Searching {len(grid)} {model_type} configs on {max_workers} workers "
+                 f"x {threads_per_trial} threads...")
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(X_train, y_train, X_val, y_val)) as pool:
+        futures = [pool.submit(_run_trial, model_type, params, threads_per_trial) for params in grid]
+        trials, best_model = [], None
+        for f in futures:
+            model, stats = f.result()
+            # keep only the best model in memory, not one per grid point
+            if best_model is None or stats["val_logloss"] < min(t["val_logloss"] for t in trials):
+                best_model = model
+            trials.append(stats)
+
+    trials.sort(key=lambda t: t["val_logloss"])
+    logging.info(f"Best params: {trials[0]['params']} (val logloss {trials[0]['val_logloss']:.4f})")
+    # the trial ran with its share of the cores; predict with all of them
+    best_model.set_params(n_jobs=-1)
+    return trials, best_model
+
+# ------------------ Evaluation ------------------
+
+def evaluate(model, X_test, y_test, group_ids=None) -> dict:
+    from sklearn.metrics import average_precision_score, log_loss, roc_auc_score
+
+    proba = model.predict_proba(X_test)[:, 1]
+    has_both_classes = len(np.unique(y_test)) > 1
+    metrics = {
+        "n_test": int(len(y_test)),
+        "roc_auc": float(roc_auc_score(y_test, proba)) if has_both_classes else None,
+        "average_precision": float(average_precision_score(y_test, proba)) if has_both_classes else None,
+        "logloss": float(log_loss(y_test, proba, labels=[0, 1])),
+    }
+    if group_ids is not None:
+        metrics["ranking"] = ranking_metrics(group_ids, proba, y_test)
+    return metrics
+
+# ------------------ Main ------------------
+
+def train(model_type: str = "lightgbm", features_path: str = FEATURES_PATH, search: bool = True,
+          max_workers: int | None = None, output_dir: str = MODELS_DIR, split: str = "random",
+          views_path: str = VIEWS_PATH) -> dict:
+    from sklearn.model_selection import train_test_split
+
+    X, y, ids = load_features(features_path)
+    groups = pd.factorize(ids["Applicant.ID"])[0]
+
+    if split == "time":
+        test_mask = time_split_mask(ids, load_view_times(views_path), test_frac=0.2)
+    else:
+        test_mask = np.zeros(len(y), dtype=bool)
+        _, test_idx = train_test_split(np.arange(len(y)), test_size=0.2, random_state=42, stratify=y)
+        test_mask[test_idx] = True
+    X_train, X_test, y_train, y_test = X[~test_mask], X[test_mask], y[~test_mask], y[test_mask]
+    X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=0.1, random_state=42,
+                                                  stratify=y_train)
+
+    trials = []
+    if search and model_type in SEARCH_SPACE:
+        trials, model = hyperparameter_search(model_type, X_fit, y_fit, X_val, y_val, max_workers=max_workers)
+        fit_stats = trials[0]
+    else:
+        logging.info(f"Fitting {model_type} model...")
+        model, fit_stats = fit_model(model_type, X_fit, y_fit, X_val, y_val)
+    metrics = {"model_type": model_type, "split": split, **fit_stats,
+               **evaluate(model, X_test, y_test, groups[test_mask]), "search": trials}
+    logging.info(f"Test metrics: roc_auc={metrics['roc_auc']} ap={metrics['average_precision']} "
+                 f"map={metrics['ranking'].get('map')} "
+                 f"fit={metrics['fit_seconds']}s peak_mem={metrics['peak_memory_mb']}MB")
+
+    os.makedirs(output_dir, exist_ok=True)
+    model_path = os.path.join(output_dir, f"{model_type}_model.pkl")
+    joblib.dump(model, model_path)
+    with open(os.path.join(output_dir, f"{model_type}_metrics.json"), "w") as f:
+        json.dump(metrics, f, indent=2)
+    # predict.py loads whichever model this points at, so it never scores with a stale model type
+    with open(os.path.join(output_dir, LATEST_MODEL_FILE), "w") as f:
+        json.dump({"model_type": model_type, "model": os.path.basename(model_path),
+                   "metrics": f"{model_type}_metrics.json"}, f, indent=2)
+    logging.info(f"Model saved to: {model_path}")
+    return metrics
 
-# Drop rows with missing similarity
-df = df.dropna(subset=["embedding_similarity"])
 
-# Define features and target
-X = df[["embedding_similarity", "location_match", "exp_years_total", "exp_recency_days"]]
-y = df["match"]
+def main(argv=None):
+    import argparse
 
-# Train/test split
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    parser = argparse.ArgumentParser(prog="flyfox train", description="Train the applicant–job match model.")
+    parser.add_argument("--model", choices=sorted(DEFAULT_PARAMS), default="lightgbm")
+    parser.add_argument("--features", default=db.database_url() or FEATURES_PATH,
+                        help="feature CSV/Parquet file or database URL")
+    parser.add_argument("--no-search", action="store_true", help="skip the hyperparameter search")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--split", choices=["random", "time"], default="random",
+                        help="hold out a random 20%% or the latest 20%% by View.Start")
+    args = parser.parse_args(argv)
 
-# Train Logistic Regression
-model = LogisticRegression(max_iter=1000)
-model.fit(X_train, y_train)
+    train(args.model, args.features, search=not args.no_search, max_workers=args.workers, split=args.split)
 
-# Evaluate
-y_pred = model.predict(X_test)
-print(classification_report(y_test, y_pred))
 
-# Save model
-joblib.dump(model, "logreg_model.pkl")
+if __name__ == "__main__":
+    main()
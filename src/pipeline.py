@@ -0,0 +1,334 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import importlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+# ------------------ Config ------------------
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CONFIG_PATH = os.path.join(PROJECT_ROOT, "config.yaml")
+
+DEFAULTS = {
+    "fingerprint": "hash",
+    "max_workers": 2,
+    "state_file": "data/.pipeline_state.json",
+    "timings_file": "data/pipeline_timings.json",
+    "database_tables": {},
+}
+
+HASH_BLOCK = 1 << 20
+DB_PREFIX = "db:"  # artifact naming a database table rather than a file
+
+
+@dataclass
+class Stage:
+    name: str
+    run: str                                  # "module:function"
+    inputs: list[str] = field(default_factory=list)
+    outputs: list[str] = field(default_factory=list)
+    after: list[str] = field(default_factory=list)
+    args: list[str] | None = None             # passed as argv to the function when set
+
+
+def load_config(path: str = CONFIG_PATH) -> dict:
+    import yaml
+
+    with open(path) as f:
+        config = (yaml.safe_load(f) or {}).get("pipeline") or {}
+    if not config.get("stages"):
+        raise ValueError(f"No pipeline stages declared in {path}")
+    return {**DEFAULTS, **config}
+
+
+def load_stages(config: dict, use_database: bool = False) -> dict[str, Stage]:
+    """Stages from the config; in database mode, files listed in `database_tables` become db:<table>."""
+    tables = config["database_tables"] if use_database else {}
+    stages = {}
+    for name, spec in config["stages"].items():
+        stage = Stage(name=name, **spec)
+        stage.inputs = [f"{DB_PREFIX}{tables[p]}" if p in tables else p for p in stage.inputs]
+        stage.outputs = [f"{DB_PREFIX}{tables[p]}" if p in tables else p for p in stage.outputs]
+        stages[name] = stage
+    return stages
+
+
+def stage_dependencies(stages: dict[str, Stage]) -> dict[str, set[str]]:
+    """Upstream stages of each stage: explicit `after` plus whoever produces one of its inputs."""
+    producers = {}
+    for stage in stages.values():
+        for out in stage.outputs:
+            if out in producers:
+                raise ValueError(f"Output {out} is produced by both {producers[out]} and {stage.name}")
+            producers[out] = stage.name
+
+    deps = {}
+    for stage in stages.values():
+        unknown = set(stage.after) - set(stages)
+        if unknown:
+            raise ValueError(f"Stage {stage.name} runs after unknown stage(s): {sorted(unknown)}")
+        deps[stage.name] = set(stage.after) | {producers[i] for i in stage.inputs if i in producers}
+        deps[stage.name].discard(stage.name)
+
+    # reject cycles up front rather than deadlocking the scheduler
+    visiting, done = set(), set()
+
+    def visit(name, path):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Pipeline has a cycle: {' -> '.join([*path, name])}")
+        visiting.add(name)
+        for dep in deps[name]:
+            visit(dep, [*path, name])
+        visiting.discard(name)
+        done.add(name)
+
+    for name in deps:
+        visit(name, [])
+    return deps
+
+
+def _with_upstream(targets, deps: dict[str, set[str]]) -> set[str]:
+    selected, stack = set(), list(targets)
+    while stack:
+        name = stack.pop()
+        if name not in deps:
+            raise ValueError(f"Unknown stage: {name} (known: {sorted(deps)})")
+        if name not in selected:
+            selected.add(name)
+            stack.extend(deps[name])
+    return selected
+
+# ------------------ Fingerprints ------------------
+
+class Fingerprinter:
+    """Content (sha256) or size+mtime fingerprints of project files and directories.
+
+    Content hashes are cached by (size, mtime_ns), so unchanged multi-GB inputs are not re-read.
+    db:<table> artifacts are fingerprinted by the table's write token in `store`.
+    """
+
+    def __init__(self, mode: str = "hash", cache: dict | None = None, root: str = PROJECT_ROOT, store=None):
+        if mode not in ("hash", "mtime"):
+            raise ValueError(f"Unknown fingerprint mode: {mode}")
+        self.mode, self.cache, self.root, self.store = mode, cache if cache is not None else {}, root, store
+
+    def _file(self, path: str) -> str:
+        st = os.stat(path)
+        if self.mode == "mtime":
+            return f"{st.st_size}:{st.st_mtime_ns}"
+        key = os.path.relpath(path, self.root)
+        cached = self.cache.get(key)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            while block := f.read(HASH_BLOCK):
+                h.update(block)
+        self.cache[key] = [st.st_size, st.st_mtime_ns, h.hexdigest()]
+        return h.hexdigest()
+
+    def path(self, rel: str) -> str | None:
+        """Fingerprint of a file or directory relative to the root, None if it doesn't exist."""
+        if rel.startswith(DB_PREFIX):
+            return self.store.table_version(rel[len(DB_PREFIX):]) if self.store else None
+        full = os.path.join(self.root, rel)
+        if os.path.isfile(full):
+            return self._file(full)
+        if os.path.isdir(full):
+            h = hashlib.sha256()
+            for dirpath, dirnames, filenames in os.walk(full):
+                dirnames.sort()
+                for fname in sorted(filenames):
+                    fpath = os.path.join(dirpath, fname)
+                    h.update(f"{os.path.relpath(fpath, full)}\0{self._file(fpath)}\n".encode())
+            return h.hexdigest()
+        return None
+
+    def stage(self, stage: Stage) -> str:
+        payload = {
+            "run": stage.run,
+            "args": stage.args,
+            "inputs": {p: self.path(p) for p in stage.inputs},
+            "outputs": {p: self.path(p) for p in stage.outputs},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def outputs_exist(self, stage: Stage) -> bool:
+        return all(self.path(p) is not None if p.startswith(DB_PREFIX) else os.path.exists(os.path.join(self.root, p))
+                   for p in stage.outputs)
+
+# ------------------ State ------------------
+
+def _load_state(path: str) -> dict:
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {"stages": {}, "hash_cache": {}}
+
+
+def _save_json(obj: dict, path: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(obj, f, indent=2)
+    os.replace(tmp, path)
+
+# ------------------ Execution ------------------
+
+def _init_worker(root: str):
+    # stage targets are imported as src.* / top-level modules relative to the project root,
+    # and relative paths in stage args resolve against the config directory like inputs/outputs
+    if PROJECT_ROOT not in sys.path:
+        sys.path.insert(0, PROJECT_ROOT)
+    os.chdir(root)
+
+
+def _run_stage(target: str, args) -> float:
+    module_name, func_name = target.split(":")
+    fn = getattr(importlib.import_module(module_name), func_name)
+    start = time.perf_counter()
+    try:
+        fn(args) if args is not None else fn()
+    except SystemExit as e:
+        # argparse errors and sys.exit(1) must fail the stage, not kill the worker
+        if e.code not in (None, 0):
+            raise RuntimeError(f"{target} exited with status {e.code}") from None
+    return time.perf_counter() - start
+
+
+def run_pipeline(config_path: str = CONFIG_PATH, targets=None, force: bool = False,
+                 dry_run: bool = False, max_workers: int | None = None) -> dict:
+    """Run `targets` (default: every stage) and their upstream stages, skipping fresh ones.
+
+    A stage is fresh when its outputs exist and the fingerprint of its inputs, outputs and
+    command matches the one recorded after its last successful run. With a database configured,
+    files listed in `database_tables` are replaced by their tables, fingerprinted by write token.
+    Stages whose upstream stages are done run concurrently in a process pool. Returns
+    per-stage status and timing.
+    """
+    from src.io import db
+
+    config = load_config(config_path)
+    store = db.connect() if db.database_url() else None
+    stages = load_stages(config, use_database=store is not None)
+    deps = stage_dependencies(stages)
+    selected = _with_upstream(targets or stages, deps)
+    forced = set(targets or stages) if force else set()
+
+    # declared paths are relative to the directory holding the config
+    root = os.path.dirname(os.path.abspath(config_path))
+    state_path = os.path.join(root, config["state_file"])
+    state = _load_state(state_path)
+    fingerprints = Fingerprinter(config["fingerprint"], state.setdefault("hash_cache", {}), root=root, store=store)
+
+    def fresh(name: str) -> bool:
+        stage = stages[name]
+        return (name not in forced and fingerprints.outputs_exist(stage)
+                and state["stages"].get(name, {}).get("fingerprint") == fingerprints.stage(stage))
+
+    started = time.perf_counter()
+    results, pending, running = {}, set(selected), {}
+    with ProcessPoolExecutor(max_workers=max_workers or config["max_workers"], initializer=_init_worker,
+                             initargs=(root,)) as pool:
+        while pending or running:
+            for name in sorted(pending):
+                if not all(d in results for d in deps[name]):
+                    continue
+                pending.discard(name)
+                stage = stages[name]
+                upstream = {results[d]["status"] for d in deps[name]}
+
+                if upstream & {"failed", "blocked"}:
+                    results[name] = {"status": "blocked", "seconds": 0.0}
+                elif dry_run:
+                    up_to_date = not upstream & {"would run"} and fresh(name)
+                    results[name] = {"status": "fresh" if up_to_date else "would run", "seconds": 0.0}
+                elif fresh(name):
+                    results[name] = {"status": "skipped", "seconds": 0.0}
+                    logging.info(f"[=] {name}: up to date, skipping")
+                else:
+                    logging.info(f"[*] {name}: running {stage.run}")
+                    running[pool.submit(_run_stage, stage.run, stage.args)] = name
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    seconds = future.result()
+                except Exception as e:
+                    results[name] = {"status": "failed", "seconds": 0.0, "error": str(e)}
+                    logging.error(f"[✗] {name} failed: {e}")
+                    continue
+                results[name] = {"status": "ran", "seconds": round(seconds, 3)}
+                state["stages"][name] = {
+                    "fingerprint": fingerprints.stage(stages[name]),
+                    "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    "seconds": round(seconds, 3),
+                }
+                # persist after every stage so an interrupted run keeps its progress
+                _save_json(state, state_path)
+                logging.info(f"[✓] {name}: done in {seconds:.1f}s")
+
+    summary = {
+        "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "total_seconds": round(time.perf_counter() - started, 3),
+        "dry_run": dry_run,
+        "stages": {name: results[name] for name in _topological(selected, deps)},
+    }
+    if not dry_run:
+        _save_json(state, state_path)
+        _save_json(summary, os.path.join(root, config["timings_file"]))
+    _log_summary(summary)
+    return summary
+
+
+def _topological(names, deps) -> list[str]:
+    order, seen = [], set()
+
+    def visit(name):
+        if name not in seen:
+            seen.add(name)
+            for dep in sorted(deps[name] & set(names)):
+                visit(dep)
+            order.append(name)
+
+    for name in sorted(names):
+        visit(name)
+    return order
+
+
+def _log_summary(summary: dict) -> None:
+    logging.info(f"{'stage':<20} {'status':<10} {'seconds':>9}")
+    for name, r in summary["stages"].items():
+        logging.info(f"{name:<20} {r['status']:<10} {r['seconds']:>9.1f}")
+    logging.info(f"{'total':<20} {'':<10} {summary['total_seconds']:>9.1f}")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="flyfox run", description="Run the pipeline stages declared in config.yaml.")
+    parser.add_argument("stages", nargs="*", help="stages to bring up to date (default: all)")
+    parser.add_argument("--config", default=CONFIG_PATH)
+    parser.add_argument("--force", action="store_true", help="rerun the named stages even if fresh")
+    parser.add_argument("--dry-run", action="store_true", help="only report which stages would run")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    summary = run_pipeline(args.config, args.stages or None, force=args.force, dry_run=args.dry_run,
+                           max_workers=args.workers)
+    return 1 if any(r["status"] in ("failed", "blocked") for r in summary["stages"].values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
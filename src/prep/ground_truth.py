@@ -1,7 +1,8 @@
 import os
 import pandas as pd
 
-from src.io.ingest import load_all_raw
+from src.io import db
+from src.io.ingest import load_csv
 from src.utils import logging_util
 # src/features/build_ground_truth.py
 def build_ground_truth(views_df: pd.DataFrame, interests_df: pd.DataFrame, jobs_df: pd.DataFrame) -> pd.DataFrame:
@@ -29,18 +30,27 @@ def build_ground_truth(views_df: pd.DataFrame, interests_df: pd.DataFrame, jobs_
                           f"(views={len(positives_views)}, interests-mapped={len(positives_interests)})")
     return positives
 
-if __name__ == "__main__":
-    # Get root-relative output path
-    PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
-    INTERIM_DIR = os.path.join(PROJECT_ROOT, "data", "interim")
-    OUTPUT_PATH = os.path.join(INTERIM_DIR, "labeled_applicant_job_pairs.csv")
+# Get root-relative output path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+INTERIM_DIR = os.path.join(PROJECT_ROOT, "data", "interim")
+OUTPUT_PATH = os.path.join(INTERIM_DIR, "positive_pairs.csv")
+
 
-    # Load raw data
-    data = load_all_raw()
+def main():
+    # Load only the raw data this step needs
+    views, interests, jobs = load_csv("views"), load_csv("interests"), load_csv("jobs")
 
     # Build and save ground truth
-    ground_truth = build_ground_truth(data["views"], data["interests"])
+    ground_truth = build_ground_truth(views, interests, jobs)
+
+    if db.database_url():
+        db.connect().write("positives", ground_truth, "replace")
+        logging_util.log_info("[✓] Saved positives to the positives table")
+    else:
+        os.makedirs(INTERIM_DIR, exist_ok=True)
+        ground_truth.to_csv(OUTPUT_PATH, index=False)
+        logging_util.log_info(f"[✓] Saved: {OUTPUT_PATH}")
 
-    os.makedirs(INTERIM_DIR, exist_ok=True)
-    ground_truth.to_csv(OUTPUT_PATH, index=False)
-    logging_util.log_info(f"[✓] Saved: {OUTPUT_PATH}")
+
+if __name__ == "__main__":
+    main()
@@ -3,32 +3,40 @@ import pandas as pd
 import random
 from typing import Set
 
+from src.io import db
 from src.utils import logging_util
-from src.io.ingest import load_all_raw
+from src.io.ingest import load_csv
+
+# fixed so reruns on unchanged inputs reproduce the same pairs (and skip the downstream stages)
+SEED = 42
 
 def generate_negatives(
     jobs_df: pd.DataFrame,
     applicants_df: pd.DataFrame,
     positives_df: pd.DataFrame,
-    neg_per_pos: int = 3
+    neg_per_pos: int = 3,
+    seed: int | None = SEED
 ) -> pd.DataFrame:
     logging_util.log_info("[*] Generating negative samples...")
 
-    job_ids = jobs_df["Job.ID"].unique()
-    applicant_ids = applicants_df["Applicant.ID"].unique()
-    existing_pairs: Set[tuple] = set(map(tuple, positives_df[["Job.ID", "Applicant.ID"]].values))
+    # compare IDs as stripped strings so CSV (int) and database (text) positives behave the same
+    job_ids = jobs_df["Job.ID"].astype(str).str.strip().unique()
+    applicant_ids = applicants_df["Applicant.ID"].astype(str).str.strip().unique()
+    existing_pairs: Set[tuple] = set(zip(positives_df["Job.ID"].astype(str).str.strip(),
+                                         positives_df["Applicant.ID"].astype(str).str.strip()))
 
-    negatives = set()
+    rng = random.Random(seed)
+    negatives = {}  # insertion-ordered, unlike a set of str tuples, so the output order is reproducible
 
     target_neg_count = len(positives_df) * neg_per_pos
     attempts = 0
     max_attempts = target_neg_count * 10  # safety
 
     while len(negatives) < target_neg_count and attempts < max_attempts:
-        j = random.choice(job_ids)
-        a = random.choice(applicant_ids)
+        j = rng.choice(job_ids)
+        a = rng.choice(applicant_ids)
         if (j, a) not in existing_pairs:
-            negatives.add((j, a))
+            negatives[(j, a)] = None
         attempts += 1
 
     logging_util.log_info(f"[✓] Generated {len(negatives)} negative samples.")
@@ -37,26 +45,40 @@ def generate_negatives(
     df_neg["label"] = 0
     return df_neg
 
-if __name__ == "__main__":
-    # Resolve path to project root
-    PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
-    INTERIM_DIR = os.path.join(PROJECT_ROOT, "data", "interim")
-    LABELED_PATH = os.path.join(INTERIM_DIR, "labeled_applicant_job_pairs.csv")
+# Resolve path to project root
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+INTERIM_DIR = os.path.join(PROJECT_ROOT, "data", "interim")
+POSITIVES_PATH = os.path.join(INTERIM_DIR, "positive_pairs.csv")
+LABELED_PATH = os.path.join(INTERIM_DIR, "labeled_applicant_job_pairs.csv")
+
 
+def main():
     # Load raw data and positive samples
-    data = load_all_raw()
-    positives = pd.read_csv(LABELED_PATH)
+    store = db.connect() if db.database_url() else None
+    if store:
+        positives = store.read_table("positives")
+    else:
+        positives = pd.read_csv(POSITIVES_PATH)
 
     # Generate negatives
     negatives = generate_negatives(
-        jobs_df=data["jobs"],
-        applicants_df=data["experience"],
+        jobs_df=load_csv("jobs"),
+        applicants_df=load_csv("experience"),
         positives_df=positives,
         neg_per_pos=3
     )
 
     # Combine and save
     full_df = pd.concat([positives, negatives], ignore_index=True)
-    os.makedirs(INTERIM_DIR, exist_ok=True)
-    full_df.to_csv(LABELED_PATH, index=False)
-    logging_util.log_info(f"[✓] Combined labeled dataset saved: {LABELED_PATH}")
+    if store:
+        # rewrite the table in one transaction, so reruns replace the old negatives instead of adding to them
+        store.write_pairs(full_df, replace=True)
+        logging_util.log_info("[✓] Pairs table rewritten with positives and fresh negatives")
+    else:
+        os.makedirs(INTERIM_DIR, exist_ok=True)
+        full_df.to_csv(LABELED_PATH, index=False)
+        logging_util.log_info(f"[✓] Combined labeled dataset saved: {LABELED_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,132 @@
-# tools/diagnose_embedding_coverage.py
-import os, pandas as pd
+# src/utils/diagnose_embedding_coverage.py
+import os
+import logging
+
+import numpy as np
+import pandas as pd
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
 
 INTERIM = os.path.join(PROJECT_ROOT, "data", "interim")
 RAW = os.path.join(PROJECT_ROOT, "data", "raw")
 EMB = os.path.join(PROJECT_ROOT, "embeddings")
+FEATURES = os.path.join(PROJECT_ROOT, "data", "features")
+
+PAIRS_PATH = os.path.join(INTERIM, "labeled_applicant_job_pairs.csv")
+JOBS_PATH = os.path.join(RAW, "Combined_Jobs_Final.csv")
+EXPERIENCE_PATH = os.path.join(RAW, "Experience.csv")
+JOB_EMBED_PARQUET = os.path.join(EMB, "jobs", "job_embeddings.parquet")
+APP_EMBED_PARQUET = os.path.join(EMB, "applicants", "applicant_embeddings.parquet")
+
+# ------------------ ID sets ------------------
+
+def normalize_ids(values) -> np.ndarray:
+    """Sorted unique string IDs; accepts any iterable, Series, array or embedding dict."""
+    if isinstance(values, dict):
+        values = list(values.keys())
+    ids = pd.Series(values, dtype=object).dropna().astype(str).str.strip()
+    return np.unique(ids.to_numpy(dtype=str))
+
+
+def read_parquet_ids(path: str, id_col: str) -> np.ndarray:
+    """IDs stored in an embedding Parquet file, reading only the ID column (never the vectors)."""
+    import pyarrow.parquet as pq
+    schema = pq.read_schema(path)
+    if id_col not in schema.names:
+        raise KeyError(f"Expected '{id_col}' in {path}, got: {schema.names[:12]}")
+    return normalize_ids(pq.read_table(path, columns=[id_col]).column(id_col).to_pandas())
+
+
+def read_csv_ids(path: str, id_col: str, **read_kwargs) -> np.ndarray:
+    return normalize_ids(pd.read_csv(path, usecols=[id_col], **read_kwargs)[id_col])
+
+# ------------------ Coverage ------------------
+
+def coverage(wanted, have) -> dict:
+    """Compare two ID collections with sorted-array set operations.
+
+    Both sides are always normalized: raw arrays may hold ints, padded strings or duplicates.
+    """
+    wanted, have = normalize_ids(wanted), normalize_ids(have)
+    missing = np.setdiff1d(wanted, have, assume_unique=True)
+    return {
+        "need": int(len(wanted)),
+        "have": int(len(have)),
+        "missing": int(len(missing)),
+        "pct_missing": 100 * len(missing) / len(wanted) if len(wanted) else 0.0,
+        "missing_ids": missing,
+    }
+
+
+def embedding_coverage(pair_job_ids, pair_app_ids, job_embed_ids, app_embed_ids,
+                       raw_job_ids=None, experience_app_ids=None) -> dict:
+    """Job/applicant embedding coverage for a set of pairs, optionally explaining the gaps.
+
+    `raw_job_ids` and `experience_app_ids` let the report split missing IDs into those that
+    could not have been embedded (no source row) and those the embedding run skipped.
+    """
+    report = {
+        "jobs": coverage(pair_job_ids, job_embed_ids),
+        "applicants": coverage(pair_app_ids, app_embed_ids),
+    }
+    if raw_job_ids is not None:
+        report["jobs"]["missing_not_in_raw"] = int(len(
+            np.setdiff1d(report["jobs"]["missing_ids"], normalize_ids(raw_job_ids), assume_unique=True)))
+    if experience_app_ids is not None:
+        report["applicants"]["missing_no_experience"] = int(len(
+            np.setdiff1d(report["applicants"]["missing_ids"], normalize_ids(experience_app_ids), assume_unique=True)))
+    return report
+
+
+def log_coverage(report: dict) -> None:
+    for kind, r in report.items():
+        logging.warning(f"{kind.capitalize()} — need {r['need']}, have {r['have']}, "
+                        f"missing {r['missing']} ({r['pct_missing']:.1f}%)")
+    if "missing_not_in_raw" in report.get("jobs", {}):
+        logging.info(f"Missing jobs that are NOT in Combined_Jobs_Final.csv: {report['jobs']['missing_not_in_raw']}")
+    if "missing_no_experience" in report.get("applicants", {}):
+        logging.info(f"Missing applicants with NO rows in Experience.csv: "
+                     f"{report['applicants']['missing_no_experience']}")
+
 
-pairs = pd.read_csv(os.path.join(INTERIM, "labeled_applicant_job_pairs.csv"))
-pairs["Job.ID"] = pairs["Job.ID"].astype(str).str.strip()
-pairs["Applicant.ID"] = pairs["Applicant.ID"].astype(str).str.strip()
+def write_missing(report: dict, out_dir: str = FEATURES) -> None:
+    """Dump the missing job/applicant IDs as missing_job_embeddings.csv / missing_app_embeddings.csv."""
+    os.makedirs(out_dir, exist_ok=True)
+    for kind, id_col, fname in (("jobs", "Job.ID", "missing_job_embeddings.csv"),
+                                ("applicants", "Applicant.ID", "missing_app_embeddings.csv")):
+        if kind in report:
+            pd.Series(report[kind]["missing_ids"], name=id_col).to_csv(os.path.join(out_dir, fname), index=False)
 
-jobs = pd.read_csv(os.path.join(RAW, "Combined_Jobs_Final.csv"), engine="python", on_bad_lines="skip",
-                   usecols=["Job.ID","Title","Position","Industry","Job.Description","Requirements"])
-jobs["Job.ID"] = jobs["Job.ID"].astype(str).str.strip()
+# ------------------ Main ------------------
 
-exp = pd.read_csv(os.path.join(RAW, "Experience.csv"))
-exp["Applicant.ID"] = exp["Applicant.ID"].astype(str).str.strip()
+def main(write_files: bool = False, explain: bool = True):
+    pairs = pd.read_csv(PAIRS_PATH, usecols=["Job.ID", "Applicant.ID"], dtype=str)
 
-# load parquet embeddings
-jobs_emb = pd.read_parquet(os.path.join(EMB, "jobs", "job_embeddings.parquet"))
-apps_emb = pd.read_parquet(os.path.join(EMB, "applicants", "applicant_embeddings.parquet"))
-jobs_emb["Job.ID"] = jobs_emb["Job.ID"].astype(str).str.strip()
-apps_emb["Applicant.ID"] = apps_emb["Applicant.ID"].astype(str).str.strip()
+    raw_job_ids = experience_app_ids = None
+    if explain:
+        raw_job_ids = read_csv_ids(JOBS_PATH, "Job.ID", engine="python", on_bad_lines="skip")
+        experience_app_ids = read_csv_ids(EXPERIENCE_PATH, "Applicant.ID")
 
-want_job_ids = set(pairs["Job.ID"].unique())
-have_job_ids = set(jobs_emb["Job.ID"].unique())
-missing_job_ids = sorted(want_job_ids - have_job_ids)
+    report = embedding_coverage(
+        pairs["Job.ID"], pairs["Applicant.ID"],
+        read_parquet_ids(JOB_EMBED_PARQUET, "Job.ID"),
+        read_parquet_ids(APP_EMBED_PARQUET, "Applicant.ID"),
+        raw_job_ids=raw_job_ids, experience_app_ids=experience_app_ids,
+    )
+    log_coverage(report)
+    if write_files:
+        write_missing(report, FEATURES)
+    return report
 
-want_app_ids = set(pairs["Applicant.ID"].unique())
-have_app_ids = set(apps_emb["Applicant.ID"].unique())
-missing_app_ids = sorted(want_app_ids - have_app_ids)
 
-print(f"Jobs — need {len(want_job_ids)}, have {len(have_job_ids)}, missing {len(missing_job_ids)}")
-print(f"Applicants — need {len(want_app_ids)}, have {len(have_app_ids)}, missing {len(missing_app_ids)}")
+if __name__ == "__main__":
+    import argparse
 
-# Where do missing jobs come from?
-in_raw_jobs = set(jobs["Job.ID"].astype(str).str.strip().unique())
-missing_jobs_not_in_raw = sorted(set(missing_job_ids) - in_raw_jobs)
-print(f"Missing jobs that are NOT in Combined_Jobs_Final.csv: {len(missing_jobs_not_in_raw)}")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Report embedding coverage of the labeled pairs.")
+    parser.add_argument("--write-missing", action="store_true", help="write missing_*_embeddings.csv")
+    parser.add_argument("--no-explain", action="store_true",
+                        help="skip reading the raw CSVs that explain where missing IDs come from")
+    args = parser.parse_args()
 
-# Which applicants have zero experience rows?
-have_exp_app_ids = set(exp["Applicant.ID"].unique())
-missing_apps_no_exp = sorted(set(missing_app_ids) - have_exp_app_ids)
-print(f"Missing applicants with NO rows in Experience.csv: {len(missing_apps_no_exp)}")
+    main(write_files=args.write_missing, explain=not args.no_explain)
@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import logging
+import subprocess
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+
+# entry points that must start without the heavy ML stack
+LIGHT_MODULES = [
+    "src.cli",
+    "src.pipeline",
+    "src.io.ingest",
+    "src.io.db",
+    "src.features",
+    "src.features.embed_text",
+    "src.features.embedding_store",
+    "src.features.job_table",
+    "src.features.build_features",
+    "src.models.evaluate",
+    "src.models.train_model",
+    "src.utils.diagnose_embedding_coverage",
+    "predict",
+]
+
+HEAVY_PACKAGES = {"torch", "transformers", "sentence_transformers", "sklearn", "lightgbm", "xgboost"}
+
+DEFAULT_BUDGET_MS = 1500.0
+
+
+def measure_import(module: str, python: str = sys.executable) -> dict:
+    """Import `module` in a fresh interpreter under `-X importtime` and summarize the trace."""
+    proc = subprocess.run([python, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=PROJECT_ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr.strip().splitlines()[-1]}")
+
+    # lines look like: "import time:       312 |        845 |   pandas.core"
+    self_us, loaded = 0, set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, _, name = line[len("import time:"):].split("|")
+        self_us += int(own)
+        loaded.add(name.strip().split(".")[0])
+
+    return {
+        "module": module,
+        "total_ms": round(self_us / 1000, 1),
+        "n_packages": len(loaded),
+        "heavy_imports": sorted(loaded & HEAVY_PACKAGES),
+    }
+
+
+def run(modules=LIGHT_MODULES, budget_ms: float = DEFAULT_BUDGET_MS) -> tuple[list[dict], list[str]]:
+    results, failures = [], []
+    for module in modules:
+        r = measure_import(module)
+        results.append(r)
+        logging.info(f"{module:<42} {r['total_ms']:>8.1f} ms  heavy={r['heavy_imports'] or '-'}")
+        if r["heavy_imports"]:
+            failures.append(f"{module} imports {', '.join(r['heavy_imports'])} at import time")
+        if r["total_ms"] > budget_ms:
+            failures.append(f"{module} takes {r['total_ms']} ms to import (budget {budget_ms} ms)")
+    return results, failures
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Track import time of the CLI entry points (python -X importtime).")
+    parser.add_argument("modules", nargs="*", default=LIGHT_MODULES)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--output", help="write the measurements as JSON")
+    args = parser.parse_args(argv)
+
+    results, failures = run(args.modules, args.budget_ms)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"budget_ms": args.budget_ms, "results": results, "failures": failures}, f, indent=2)
+    for failure in failures:
+        logging.error(failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    sys.exit(main())
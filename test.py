@@ -1,5 +1,8 @@
-import pandas as pd
-from src.utils import logging_util
+import sys
 
-df = pd.read_csv("job_data.csv")
-logging_util.log_info(df.columns.tolist())
+import pytest
+
+# ------------------ Main ------------------
+
+if __name__ == "__main__":
+    sys.exit(pytest.main(["-q", "tests", *sys.argv[1:]]))
@@ -0,0 +1,108 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.io import db
+
+POSTGRES_URL_ENV = "FLYFOX_TEST_POSTGRES_URL"  # a scratch database; its tables are dropped
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return db.connect(f"sqlite:///{tmp_path / 'flyfox.db'}")
+    url = os.environ.get(POSTGRES_URL_ENV)
+    if not url:
+        pytest.skip(f"set {POSTGRES_URL_ENV} to run against PostgreSQL")
+    pytest.importorskip("psycopg2")
+    store = db.connect(url)
+    with store.connection() as conn:
+        for table in [*db.TABLES, db.VERSIONS_TABLE]:
+            conn.cursor().execute(f"DROP TABLE IF EXISTS {table}")
+    store.create_tables()
+    return store
+
+
+def _sorted(df: pd.DataFrame, key=("Applicant.ID", "Job.ID")) -> pd.DataFrame:
+    return df.sort_values(list(key)).reset_index(drop=True)
+
+
+def test_pairs_replace_and_insert(store):
+    store.write_pairs(pd.DataFrame({"Job.ID": [1, 2, 2], "Applicant.ID": [" 7", "7", "7"], "label": [1, 1, 1]}),
+                      replace=True)
+    # existing keys keep their label, new ones (and in-batch duplicates) are inserted once
+    store.write_pairs(pd.DataFrame({"Job.ID": ["1", "3", "3"], "Applicant.ID": ["7", "7", "8"],
+                                    "label": [0, 0, 0]}))
+    pairs = _sorted(store.read_table("pairs"))
+    assert pairs["Job.ID"].tolist() == ["1", "2", "3", "3"]
+    assert pairs["Applicant.ID"].tolist() == ["7", "7", "7", "8"]
+    assert pairs["label"].astype(int).tolist() == [1, 1, 0, 0]
+
+
+def test_upsert_with_duplicate_keys_keeps_last(store):
+    preds = pd.DataFrame({"Applicant.ID": ["a", "a", "b"], "Job.ID": ["1", "1", "1"],
+                          "match_probability": [0.1, 0.2, 0.3]})
+    assert store.upsert_predictions(preds) == 2
+    store.upsert_predictions(pd.DataFrame({"Applicant.ID": ["b", "b", "c"], "Job.ID": ["1", "1", "1"],
+                                           "match_probability": [0.4, 0.5, 0.6]}))
+    got = _sorted(store.read_table("predictions"))
+    assert got["Applicant.ID"].tolist() == ["a", "b", "c"]
+    assert got["match_probability"].tolist() == pytest.approx([0.2, 0.5, 0.6])
+
+
+def test_stream_while_writing_and_export(store, tmp_path):
+    n = 2_500
+    store.write_pairs(pd.DataFrame({"Job.ID": np.arange(n), "Applicant.ID": np.arange(n) % 50,
+                                    "label": np.arange(n) % 2}), replace=True)
+    store.clear("features")
+    chunks = 0
+    for batch in store.iter_table("pairs", chunksize=1_000):
+        chunks += 1
+        store.write_features(batch.assign(embedding_similarity=0.5, location_match=np.nan), replace=False)
+    assert chunks == 3
+
+    features = store.read_table("features")
+    assert len(features) == n
+    assert features["label"].astype(int).sum() == n // 2
+    assert features["location_match"].isna().all()
+
+    path = tmp_path / "features.csv"
+    store.export("features", str(path))
+    exported = pd.read_csv(path)
+    assert list(exported.columns[:3]) == ["Job.ID", "Applicant.ID", "label"]
+    assert len(exported) == n
+
+
+def test_write_batches_is_all_or_nothing(store):
+    store.write_features(pd.DataFrame({"Job.ID": ["old"], "Applicant.ID": ["a"], "label": [1]}))
+
+    def failing():
+        yield pd.DataFrame({"Job.ID": ["1", "2"], "Applicant.ID": ["a", "a"], "label": [0, 1]})
+        raise RuntimeError("feature build failed")
+
+    with pytest.raises(RuntimeError):
+        store.write_batches("features", failing())
+    assert store.read_table("features")["Job.ID"].tolist() == ["old"]
+
+    # a key repeated across batches keeps the later row
+    batches = [pd.DataFrame({"Job.ID": ["1", "2"], "Applicant.ID": ["a", "a"], "label": [0, 1],
+                             "embedding_similarity": [0.1, 0.2]}),
+               pd.DataFrame({"Job.ID": ["2"], "Applicant.ID": ["a"], "label": [1], "embedding_similarity": [0.9]})]
+    store.write_batches("features", iter(batches))
+    got = _sorted(store.read_table("features"), key=("Job.ID",))
+    assert got["Job.ID"].tolist() == ["1", "2"]
+    assert got["embedding_similarity"].tolist() == pytest.approx([0.1, 0.9])
+
+
+def test_table_version_changes_on_write_only(store):
+    assert store.table_version("pairs") is None
+    store.write_pairs(pd.DataFrame({"Job.ID": ["1"], "Applicant.ID": ["7"], "label": [1]}), replace=True)
+    first = store.table_version("pairs")
+    store.read_table("pairs")
+    assert store.table_version("pairs") == first
+    assert store.table_version("features") is None
+
+    store.write_pairs(pd.DataFrame({"Job.ID": ["2"], "Applicant.ID": ["7"], "label": [0]}))
+    assert store.table_version("pairs") not in (None, first)
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features.build_features import add_structured_features
+from src.features.job_table import MISSING, UNKNOWN, JobTable, build_job_table, city_mentioned
+
+JOBS = pd.DataFrame({
+    "Job.ID": ["1", "2", "3", " 4", "5"],
+    "City": ["St. Louis", "Boston", "Salt Lake City South", None, "boston"],
+    "State.Code": ["MO", "MA", "UT", "CA", None],
+})
+TEXTS = pd.Series([
+    "Warehouse job near st louis, apply now",
+    "Remote role, occasional travel to Salt Lake City South",
+    "Based in Boston",
+    "Anywhere",
+    "Bostonian company",
+])
+EXTRA_CITIES = ["Chicago", "Salt Lake City South"]
+
+# (job id, applicant city, applicant state) -> (state_match, city_match, location_match)
+CASES = [
+    (("1", "st louis", "mo"), (1, 1, 1)),
+    (("1", "ST. LOUIS ", "MA"), (0, 1, 1)),
+    (("2", "Boston", "MA"), (1, 1, 0)),
+    (("3", "Boston", "UT"), (1, 0, 1)),
+    (("3", "Salt Lake City South", "UT"), (1, 1, 0)),  # longer than MAX_CITY_WORDS: never searched in text
+    (("2", "Salt Lake City South", None), (0, 0, 0)),
+    (("4", None, "CA"), (1, 1, 0)),                     # both cities missing still match
+    (("5", "Boston", None), (1, 1, 0)),                 # "bostonian" is not a whole-word mention
+    (("1", "Atlantis", "ZZ"), (0, 0, 0)),               # unknown to the vocabulary
+    (("2", "Atlantis", "ZZ"), (0, 0, 0)),
+    (("99", "Boston", "MA"), (0, 0, 0)),                # job not in the table
+]
+
+
+def _pairs() -> pd.DataFrame:
+    return pd.DataFrame([{"Job.ID": j, "exp_last_city": c, "exp_last_state": s} for (j, c, s), _ in CASES])
+
+
+def _expected(col: int) -> list[int]:
+    return [flags[col] for _, flags in CASES]
+
+
+def test_table_location_features():
+    table = build_job_table(JOBS, TEXTS, extra_cities=EXTRA_CITIES)
+    pairs = _pairs()
+    flags = table.pair_location_features(pairs["Job.ID"], pairs["exp_last_city"], pairs["exp_last_state"])
+    assert flags["state_match"].tolist() == _expected(0)
+    assert flags["city_match"].tolist() == _expected(1)
+    assert flags["location_match"].tolist() == _expected(2)
+
+
+def test_fallback_matches_table():
+    table = build_job_table(JOBS, TEXTS, extra_cities=EXTRA_CITIES)
+    jobs = JOBS.assign(**{"Job.ID": JOBS["Job.ID"].str.strip(), "text": TEXTS})
+
+    with_table = add_structured_features(_pairs(), table)
+    fallback = add_structured_features(_pairs().merge(jobs, on="Job.ID", how="left"))
+    for col in ("state_match", "city_match", "location_match"):
+        assert fallback[col].tolist() == with_table[col].tolist(), col
+
+
+def test_vocabulary_keeps_long_and_unknown_cities_apart():
+    table = build_job_table(JOBS, TEXTS, extra_cities=EXTRA_CITIES)
+    assert "salt lake city south" in table.city_vocab
+    assert table.city.tolist()[2] == table.city_vocab["salt lake city south"]
+    assert table.city.tolist()[3] == MISSING
+    assert UNKNOWN not in table.city.tolist()
+
+
+def test_jobs_in_location():
+    table = build_job_table(JOBS, TEXTS, extra_cities=EXTRA_CITIES)
+    assert table.jobs_in_location(city="BOSTON").tolist() == ["2", "5"]
+    assert table.jobs_in_location(city="Boston", state="MA").tolist() == ["2"]
+    assert table.jobs_in_location(city="Salt Lake City South").tolist() == ["3"]
+    assert table.jobs_in_location(city="Atlantis").tolist() == []
+    assert len(table.jobs_in_location()) == len(JOBS)
+
+
+def test_save_load_roundtrip(tmp_path):
+    table = build_job_table(JOBS, TEXTS, extra_cities=EXTRA_CITIES)
+    table.save(str(tmp_path))
+    loaded = JobTable.load(str(tmp_path))
+    pairs = _pairs()
+    for name, values in loaded.pair_location_features(pairs["Job.ID"], pairs["exp_last_city"],
+                                                      pairs["exp_last_state"]).items():
+        assert values.tolist() == _expected(("state_match", "city_match", "location_match").index(name))
+
+
+def test_city_mentioned():
+    got = city_mentioned(["St Louis", "louis", None, "new york city ny"],
+                         ["Job in ST. LOUIS!", "louisville", "anything", "new york city ny"])
+    assert got.tolist() == [True, False, False, False]
+    assert city_mentioned(np.array([], dtype=object), []).tolist() == []
+
+
+def test_embedding_gather_matches_dict_lookup():
+    from src.features.build_features import compute_embedding_similarity
+    from src.features.embedding_store import EmbeddingMatrix
+
+    rng = np.random.default_rng(0)
+    job_vecs = {j: rng.random(4) for j in ["5", "1", "3"]}        # no vector for jobs 2 and 4
+    app_vecs = {"a": rng.random(4), "b": np.zeros(4)}
+    jobs = EmbeddingMatrix.from_dict(job_vecs)
+    table = build_job_table(JOBS, TEXTS, embedding_ids=jobs.ids, extra_cities=EXTRA_CITIES)
+    assert table.matches_embeddings(jobs)
+
+    pairs = pd.DataFrame({"Job.ID": ["1", "2", "3", "5", "99", "1"], "Applicant.ID": ["a", "a", "b", "a", "a", "c"]})
+    rows = table.rows_for(pairs["Job.ID"])
+    gathered = compute_embedding_similarity(pairs.copy(), jobs, EmbeddingMatrix.from_dict(app_vecs),
+                                            job_rows=table.embedding_rows(rows))
+    looked_up = compute_embedding_similarity(pairs.copy(), job_vecs, app_vecs)
+
+    def cos(j, a):
+        return job_vecs[j] @ app_vecs[a] / np.linalg.norm(job_vecs[j]) / np.linalg.norm(app_vecs[a])
+
+    expected = [cos("1", "a"), 0.0, 0.0, cos("5", "a"), 0.0, 0.0]
+    assert gathered["embedding_similarity"].to_numpy() == pytest.approx(expected, abs=1e-6)
+    assert looked_up["embedding_similarity"].to_numpy() == pytest.approx(expected, abs=1e-6)
+    assert gathered["has_both_embeds"].tolist() == [1, 0, 1, 1, 0, 0]
+
+
+def test_stale_job_table_is_ignored(tmp_path):
+    from src.features.job_table import load_fresh_job_table, source_fingerprints
+
+    source = tmp_path / "jobs.csv"
+    source.write_text("Job.ID\n1\n")
+    table = build_job_table(JOBS, TEXTS, extra_cities=EXTRA_CITIES)
+    table.meta["sources"] = source_fingerprints([str(source), str(tmp_path / "not_there.csv")])
+    table.save(str(tmp_path / "table"))
+    assert load_fresh_job_table(str(tmp_path / "table")) is not None
+
+    source.write_text("Job.ID\n1\n2\n")
+    assert load_fresh_job_table(str(tmp_path / "table")) is None
+    assert load_fresh_job_table(str(tmp_path / "missing")) is None
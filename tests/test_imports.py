@@ -0,0 +1,11 @@
+import pytest
+
+from src.utils.import_benchmark import LIGHT_MODULES, measure_import
+
+
+# wall-clock import budgets are left to `python -m src.utils.import_benchmark`; they are too
+# noisy on loaded or cold-cache machines to fail the test run
+@pytest.mark.parametrize("module", LIGHT_MODULES)
+def test_entry_point_imports_stay_light(module):
+    r = measure_import(module)
+    assert not r["heavy_imports"], f"{module} imports {', '.join(r['heavy_imports'])} at import time"
@@ -0,0 +1,68 @@
+import math
+
+import numpy as np
+import pytest
+
+from src.models.evaluate import ranking_metrics
+
+KS = (1, 3, 5)
+
+
+def naive_ranking_metrics(group_ids, scores, labels, ks=KS) -> dict:
+    """Per-group loop over the ranked list; the reference the vectorized version must match."""
+    per_group = {}
+    for g, s, y in zip(group_ids, scores, labels):
+        per_group.setdefault(g, []).append((s, y))
+
+    sums, n_eval = {}, 0
+    for rows in per_group.values():
+        ranked = [y > 0 for _, y in sorted(rows, key=lambda r: -r[0])]
+        n_rel = sum(ranked)
+        if n_rel == 0:
+            continue
+        n_eval += 1
+        hits, ap = 0, 0.0
+        for i, rel in enumerate(ranked):
+            if rel:
+                hits += 1
+                ap += hits / (i + 1)
+        sums["map"] = sums.get("map", 0.0) + ap / n_rel
+        for k in ks:
+            top = ranked[:k]
+            dcg = sum(1 / math.log2(i + 2) for i, rel in enumerate(top) if rel)
+            idcg = sum(1 / math.log2(i + 2) for i in range(min(n_rel, k)))
+            for name, value in ((f"precision@{k}", sum(top) / k), (f"recall@{k}", sum(top) / n_rel),
+                                (f"ndcg@{k}", dcg / idcg)):
+                sums[name] = sums.get(name, 0.0) + value
+    return {name: total / n_eval for name, total in sums.items()}
+
+
+def test_ranking_metrics_match_naive_reference():
+    rng = np.random.default_rng(7)
+    n = 400
+    group_ids = rng.integers(0, 40, n)
+    scores = rng.permutation(n) / n          # distinct scores, so the ranking has no ties
+    labels = (rng.random(n) < 0.25).astype(int)
+
+    got = ranking_metrics(group_ids, scores, labels, ks=KS)
+    expected = naive_ranking_metrics(group_ids, scores, labels)
+    assert got["n_groups"] == len(set(group_ids))
+    for name, value in expected.items():
+        assert got[name] == pytest.approx(value), name
+
+
+def test_ranking_metrics_hand_computed_group():
+    # one applicant, ranked: pos, neg, pos -> AP = (1/1 + 2/3) / 2
+    got = ranking_metrics(["a", "a", "a"], [0.9, 0.5, 0.1], [1, 0, 1], ks=(1, 3))
+    assert got["map"] == pytest.approx((1 + 2 / 3) / 2)
+    assert got["precision@1"] == 1.0
+    assert got["recall@1"] == 0.5
+    assert got["ndcg@3"] == pytest.approx((1 + 1 / math.log2(4)) / (1 + 1 / math.log2(3)))
+
+
+def test_ranking_metrics_skips_groups_without_positives():
+    got = ranking_metrics(["a", "a", "b", "b"], [0.9, 0.1, 0.8, 0.2], [0, 1, 0, 0], ks=(1,))
+    assert got["n_groups"] == 2
+    assert got["n_groups_evaluated"] == 1
+    assert got["map"] == pytest.approx(0.5)
+    assert got["precision@1"] == 0.0
@@ -0,0 +1,87 @@
+import json
+import sys
+
+import pandas as pd
+import pytest
+
+from src.io import db
+from src.pipeline import run_pipeline
+
+STAGES_MODULE = '''
+import os
+
+def upper(argv):
+    src, dst = argv
+    with open(src) as f:
+        text = f.read()
+    if os.environ.get("FLYFOX_DATABASE_URL") and dst == "out.txt":
+        import pandas as pd
+        from src.io import db
+        db.connect().write_pairs(pd.DataFrame({"Job.ID": [text.upper()], "Applicant.ID": ["a"], "label": [1]}),
+                                 replace=True)
+        return
+    with open(dst, "w") as f:
+        f.write(text.upper())
+'''
+
+CONFIG = {
+    "pipeline": {
+        "fingerprint": "hash",
+        "max_workers": 2,
+        "state_file": "state/pipeline.json",
+        "timings_file": "state/timings.json",
+        "database_tables": {"out.txt": "pairs"},
+        "stages": {
+            "first": {"run": "toy_stages:upper", "args": ["in.txt", "mid.txt"],
+                      "inputs": ["in.txt"], "outputs": ["mid.txt"]},
+            "second": {"run": "toy_stages:upper", "args": ["mid.txt", "out.txt"],
+                       "inputs": ["mid.txt"], "outputs": ["out.txt"]},
+        },
+    }
+}
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    root = tmp_path / "project"
+    root.mkdir()
+    (root / "toy_stages.py").write_text(STAGES_MODULE)
+    (root / "in.txt").write_text("hello")
+    (root / "config.yaml").write_text(json.dumps(CONFIG))  # JSON is valid YAML
+    monkeypatch.syspath_prepend(str(root))
+    monkeypatch.delitem(sys.modules, "toy_stages", raising=False)
+    # start from elsewhere: stage args must still resolve against the config directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("FLYFOX_DATABASE_URL", raising=False)
+    return root
+
+
+def _statuses(summary: dict) -> dict:
+    return {name: r["status"] for name, r in summary["stages"].items()}
+
+
+def test_skips_fresh_stages_and_resolves_args_against_root(project):
+    assert _statuses(run_pipeline(str(project / "config.yaml"))) == {"first": "ran", "second": "ran"}
+    assert (project / "out.txt").read_text() == "HELLO"
+
+    assert _statuses(run_pipeline(str(project / "config.yaml"))) == {"first": "skipped", "second": "skipped"}
+
+    (project / "in.txt").write_text("changed")
+    assert _statuses(run_pipeline(str(project / "config.yaml"), dry_run=True)) == {
+        "first": "would run", "second": "would run"}
+    assert _statuses(run_pipeline(str(project / "config.yaml"))) == {"first": "ran", "second": "ran"}
+    assert (project / "out.txt").read_text() == "CHANGED"
+
+
+def test_database_tables_are_fingerprinted_by_write_token(project, monkeypatch):
+    url = f"sqlite:///{project / 'flyfox.db'}"
+    monkeypatch.setenv("FLYFOX_DATABASE_URL", url)
+    assert _statuses(run_pipeline(str(project / "config.yaml"))) == {"first": "ran", "second": "ran"}
+    assert not (project / "out.txt").exists()
+    assert db.connect(url).read_table("pairs")["Job.ID"].tolist() == ["HELLO"]
+
+    assert _statuses(run_pipeline(str(project / "config.yaml"))) == {"first": "skipped", "second": "skipped"}
+
+    # another write to the table makes the stage that produces it stale
+    db.connect(url).write_pairs(pd.DataFrame({"Job.ID": ["x"], "Applicant.ID": ["b"], "label": [0]}), replace=True)
+    assert _statuses(run_pipeline(str(project / "config.yaml"))) == {"first": "skipped", "second": "ran"}
@@ -0,0 +1,26 @@
+import pandas as pd
+
+from src.io import db
+from src.prep import negative_sampling
+
+JOBS = pd.DataFrame({"Job.ID": range(100)})
+APPLICANTS = pd.DataFrame({"Applicant.ID": range(50)})
+POSITIVES = pd.DataFrame({"Job.ID": [str(i) for i in range(10)], "Applicant.ID": [str(i) for i in range(10)],
+                          "label": 1})
+
+
+def test_negative_sampling_reruns_replace_negatives(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'flyfox.db'}"
+    monkeypatch.setenv(db.DATABASE_URL_ENV, url)
+    monkeypatch.setattr(negative_sampling, "load_csv", {"jobs": JOBS, "experience": APPLICANTS}.get)
+    db.connect(url).write("positives", POSITIVES, "replace")
+
+    runs = []
+    for _ in range(2):
+        negative_sampling.main()
+        pairs = db.connect(url).read_table("pairs")
+        assert (pairs["label"] == 1).sum() == len(POSITIVES)
+        assert (pairs["label"] == 0).sum() == 3 * len(POSITIVES)
+        runs.append(pairs.sort_values(["Job.ID", "Applicant.ID"]).reset_index(drop=True))
+    # seeded: unchanged inputs reproduce the same negatives
+    pd.testing.assert_frame_equal(runs[0], runs[1])
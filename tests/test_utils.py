@@ -0,0 +1,18 @@
+import numpy as np
+
+from src.utils.diagnose_embedding_coverage import coverage, embedding_coverage
+
+
+def test_coverage_normalizes_arrays():
+    report = coverage(np.array([1, 2, 2, 3]), np.array([" 1", "2 "], dtype=object))
+    assert (report["need"], report["have"], report["missing"]) == (3, 2, 1)
+    assert report["missing_ids"].tolist() == ["3"]
+
+
+def test_embedding_coverage_explains_missing_ids():
+    report = embedding_coverage(["10", "11", "12"], [5, 6], {"10": None}, np.array([5]),
+                                raw_job_ids=[11], experience_app_ids=np.array([" 6"]))
+    assert report["jobs"]["missing_ids"].tolist() == ["11", "12"]
+    assert report["jobs"]["missing_not_in_raw"] == 1
+    assert report["applicants"]["missing"] == 1
+    assert report["applicants"]["missing_no_experience"] == 0